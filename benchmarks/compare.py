@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HISTORY = os.path.join(ROOT, "benchmarks", "history.jsonl")
+
+# ------------------------------------------------------------------------------#
+
+
+def load_history(file_name):
+    if not os.path.exists(file_name):
+        return []
+    with open(file_name) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ------------------------------------------------------------------------------#
+
+
+def record(results, file_name):
+    # append the results of a benchmark run to the history
+    with open(file_name, "a") as f:
+        f.write(json.dumps(results) + "\n")
+
+
+# ------------------------------------------------------------------------------#
+
+
+def get_baseline(history, results, baseline):
+    # the baseline is a results file, a revision (or its prefix) in the history,
+    # or the last run in the history of a different revision
+    if baseline is not None and os.path.exists(baseline):
+        with open(baseline) as f:
+            return json.load(f)
+
+    for run in reversed(history):
+        if baseline is None:
+            if run["revision"] != results["revision"]:
+                return run
+        elif run["revision"].startswith(baseline):
+            return run
+
+    raise ValueError("Baseline " + str(baseline) + " not found in the history")
+
+
+# ------------------------------------------------------------------------------#
+
+
+def noise(t):
+    # robust estimate of the standard deviation of the timings
+    t = np.asarray(t)
+    return 1.4826 * np.median(np.abs(t - np.median(t)))
+
+
+# ------------------------------------------------------------------------------#
+
+
+def compare(base, new, rel_tol, num_sigma, abs_tol):
+    # compare the median timings of each case and phase, a change is significant if
+    # it exceeds the relative tolerance, the noise of both runs and the absolute
+    # tolerance
+    report = []
+    for case, phases in sorted(new["cases"].items()):
+        if case not in base["cases"]:
+            continue
+        for phase, t_new in sorted(phases.items()):
+            t_base = base["cases"][case].get(phase, None)
+            if t_base is None:
+                continue
+
+            m_base, m_new = np.median(t_base), np.median(t_new)
+            sigma = np.sqrt(noise(t_base) ** 2 + noise(t_new) ** 2)
+            threshold = max(rel_tol * m_base, num_sigma * sigma, abs_tol)
+
+            if m_new - m_base > threshold:
+                status = "SLOWER"
+            elif m_base - m_new > threshold:
+                status = "faster"
+            else:
+                status = "ok"
+
+            report.append((case, phase, m_base, m_new, threshold, status))
+    return report
+
+
+# ------------------------------------------------------------------------------#
+
+
+def print_report(report, base, new):
+    print("baseline " + base["revision"][:8] + " (" + base["date"] + ")")
+    print("current  " + new["revision"][:8] + " (" + new["date"] + ")")
+
+    width = max([len(r[0]) for r in report] + [4])
+    header = "%-*s  %-24s %10s %10s %8s  %s"
+    print(header % (width, "case", "phase", "base [s]", "new [s]", "change", "status"))
+    for case, phase, m_base, m_new, _, status in report:
+        change = (m_new - m_base) / m_base * 100 if m_base > 0 else 0.0
+        row = "%-*s  %-24s %10.4f %10.4f %+7.1f%%  %s"
+        print(row % (width, case, phase, m_base, m_new, change, status))
+
+    regressed = [r for r in report if r[5] == "SLOWER"]
+    if regressed:
+        phases = sorted(set(r[1] for r in regressed))
+        print("FAIL: regression in " + ", ".join(phases))
+    else:
+        print("PASS")
+    return not regressed
+
+
+# ------------------------------------------------------------------------------#
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track the benchmark results")
+    parser.add_argument("action", choices=["record", "check"])
+    parser.add_argument("results", help="results file written by run.py")
+    parser.add_argument("--history", default=HISTORY)
+    parser.add_argument("--baseline", default=None, help="results file or revision")
+    parser.add_argument("--rel-tol", type=float, default=0.1)
+    parser.add_argument("--num-sigma", type=float, default=3.0)
+    parser.add_argument("--abs-tol", type=float, default=1e-3, help="seconds")
+    parser.add_argument("--record", action="store_true", help="record after the check")
+    args = parser.parse_args()
+
+    with open(args.results) as f:
+        results = json.load(f)
+
+    if args.action == "record":
+        record(results, args.history)
+        return
+
+    base = get_baseline(load_history(args.history), results, args.baseline)
+    if base.get("steps") != results.get("steps"):
+        print("WARNING: different number of transport steps in the two runs")
+    report = compare(base, results, args.rel_tol, args.num_sigma, args.abs_tol)
+    passed = print_report(report, base, results)
+
+    if args.record:
+        record(results, args.history)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import argparse
+import fnmatch
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+import numpy as np
+import scipy
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import porepy as pp
+import discretization as compute
+from grid_export import grid_export
+from mesh import create_gb, copy_gb
+
+# ------------------------------------------------------------------------------#
+
+# mesh sizes of the example 1, used for the geometries of the unit cube
+MESH_SIZES = {
+    "1k": 0.095,
+    "3k": 0.8375 * np.power(2.0, -4),
+    "10k": 0.91 * np.power(2.0, -5),
+}
+
+# cases run when none is given on the command line
+DEFAULT_CASES = ["example1_DFN_1_*", "example2_*", "example3_*"]
+
+# ------------------------------------------------------------------------------#
+
+
+def load_example(name):
+    # load the main.py of an example to reuse its boundary conditions
+    file_name = os.path.join(ROOT, "examples", name, "main.py")
+    spec = importlib.util.spec_from_file_location(name + "_main", file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ------------------------------------------------------------------------------#
+
+
+def get_geometries():
+    # geometry name, .fab file, tolerance, boundary flag, mesh sizes and parameters
+    geometries = []
+
+    folder = os.path.join(ROOT, "geometries")
+    example1 = load_example("example1")
+    param = {"k": 1, "diff": 1e-4, "time_step": 0.05}
+    for simul in np.arange(1, 22):
+        name = "example1_DFN_" + str(simul)
+        file_name = os.path.join(folder, "example1", "DFN_" + str(simul) + ".fab")
+        geometries.append((name, file_name, 1e-8, example1.bc_flag, MESH_SIZES, param))
+
+    example2 = load_example("example2")
+    file_name = os.path.join(folder, "example2.fab")
+    geometries.append(("example2", file_name, 1e-5, example2.bc_flag, MESH_SIZES, param))
+
+    example3 = load_example("example3")
+    file_name = os.path.join(folder, "example3_connected.fab")
+    gamma = 2.44e-9 * 0.125
+    theta = 80 * pp.CELSIUS
+    param = {
+        "k": 1.84e-6,
+        "bc_flow": 2500 * pp.METER / 5,
+        "diff": 0.35e-9,
+        "mass_weight": 1.95e-3,
+        "src": gamma * theta,
+        "reaction": gamma,
+        "bc_trans": 30 * pp.CELSIUS,
+        "init_trans": theta,
+        "time_step": 3.154e7 / 200,
+    }
+    # the example 3 is meshed only at the size of the paper
+    mesh_sizes = {"100m": 1e2}
+    geometries.append(("example3", file_name, 1e-3, example3.bc_same, mesh_sizes, param))
+
+    return geometries
+
+
+# ------------------------------------------------------------------------------#
+
+
+def get_cases(patterns):
+    cases = []
+    for geo, file_name, tol, bc_flag, mesh_sizes, param in get_geometries():
+        for mesh_key, mesh_size in mesh_sizes.items():
+            for discr_key in compute.get_discr().keys():
+                name = "_".join([geo, mesh_key, discr_key])
+                if any(fnmatch.fnmatch(name, p) for p in patterns):
+                    case = {
+                        "name": name,
+                        "file_name": file_name,
+                        "tol": tol,
+                        "bc_flag": bc_flag,
+                        "mesh_size": mesh_size,
+                        "discr_key": discr_key,
+                        "param": param,
+                    }
+                    cases.append(case)
+    return cases
+
+
+# ------------------------------------------------------------------------------#
+
+
+def timed(fct, *args):
+    start = time.perf_counter()
+    fct(*args)
+    return time.perf_counter() - start
+
+
+# ------------------------------------------------------------------------------#
+
+
+def run_case(case, gb_mesh, folder, n_steps):
+    # run once the case and return the wall time of each phase
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+
+    discr = compute.get_discr()[case["discr_key"]]
+    tol, bc_flag = case["tol"], case["bc_flag"]
+
+    gb = copy_gb(gb_mesh)
+    if case["discr_key"] == "MVEM":
+        pp.coarsening.coarsen(gb, "by_volume")
+
+    param = dict(case["param"])
+    param.update(
+        {
+            "domain": gb.bounding_box(as_dict=True),
+            "tol": tol,
+            "n_steps": n_steps,
+            "folder": folder,
+        }
+    )
+
+    times = {}
+    times["data_flow"] = timed(compute.data_flow, copy_gb(gb), discr, "flow", param, bc_flag)
+
+    compute.flow(gb, discr, param, bc_flag)
+    with open(os.path.join(folder, "perf_flow.json")) as f:
+        phases = json.load(f)["phases"]
+    for phase in ["assembly", "solve"]:
+        times["flow." + phase] = phases[phase]["total"]
+
+    # the export assumes simplicial grids, as in the examples only for Tpfa
+    if case["discr_key"] == "Tpfa":
+        grid_folder = os.path.join(folder, "grid/")
+        times["grid_export"] = timed(grid_export, gb, None, grid_folder)
+
+    compute.advdiff(gb, discr, param, bc_flag)
+    with open(os.path.join(folder, "perf_transport.json")) as f:
+        phases = json.load(f)["phases"]
+    for phase in ["assembly", "factorization", "solve", "export", "outflow"]:
+        if phase in phases:
+            times["transport." + phase] = phases[phase]["total"]
+
+    times["compute_outflow"] = timed(compute.compute_outflow, gb, param)
+
+    return times
+
+
+# ------------------------------------------------------------------------------#
+
+
+def revision():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT)
+        return rev.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ------------------------------------------------------------------------------#
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the flow and transport")
+    parser.add_argument("cases", nargs="*", default=DEFAULT_CASES, help="case patterns")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=10, help="transport time steps")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results"))
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args()
+
+    cases = get_cases(args.cases)
+    if args.list:
+        print("\n".join(c["name"] for c in cases))
+        return
+
+    compute.setup_custom_logger(os.path.join(ROOT, "benchmarks", "log.txt"), screen=False)
+    cache = os.path.join(ROOT, "benchmarks", "mesh_cache")
+    scratch = os.path.join(ROOT, "benchmarks", "scratch")
+
+    results = {
+        "revision": revision(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "versions": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "porepy": getattr(pp, "__version__", "unknown"),
+        },
+        "repeat": args.repeat,
+        "steps": args.steps,
+        "cases": {},
+    }
+
+    for case in cases:
+        mesh_kwargs = {
+            "mesh_size_frac": case["mesh_size"],
+            "mesh_size_min": case["mesh_size"] / 20,
+        }
+        gb_mesh = create_gb(case["file_name"], mesh_kwargs, case["tol"], cache=cache)
+
+        times = {}
+        for _ in np.arange(args.repeat):
+            folder = os.path.join(scratch, case["name"])
+            for phase, t in run_case(case, gb_mesh, folder, args.steps).items():
+                times.setdefault(phase, []).append(t)
+
+        results["cases"][case["name"]] = times
+        print(case["name"])
+        for phase, t in times.items():
+            print("    %-26s %10.4f s (min %.4f)" % (phase, np.median(t), np.amin(t)))
+
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    file_out = "_".join([time.strftime("%Y%m%d_%H%M%S"), results["revision"][:8]])
+    file_out = os.path.join(args.output, file_out + ".json")
+    with open(file_out, "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results saved in " + file_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import numpy as np
+
+import sys; sys.path.insert(0, "../../src/")
+import discretization as compute
+from ensemble import run_ensemble
+from mesh import create_gb
+
+from main import get_mesh_sizes, simulation
+
+
+def get_jobs():
+    input_folder = os.path.abspath("../../geometries/example1/")
+    num_simul = 21
+
+    jobs = []
+    for mesh_size_key, mesh_size in get_mesh_sizes().items():
+        for discr_key in compute.get_discr().keys():
+            for simul in np.arange(1, num_simul + 1):
+                folder = "solution_" + discr_key + "_" + mesh_size_key + "_" + str(simul)
+                jobs.append(
+                    {
+                        "name": folder,
+                        "folder": folder,
+                        "file_name": os.path.join(input_folder, "DFN_" + str(simul) + ".fab"),
+                        "discr_key": discr_key,
+                        "mesh_size": mesh_size,
+                        "cache": os.path.abspath("mesh_cache"),
+                    }
+                )
+    return jobs
+
+
+def run(job):
+    # geometric tolerance
+    tol = 1e-8
+
+    mesh_size = job["mesh_size"]
+    mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
+
+    # the job is executed in its own folder
+    gb = create_gb(job["file_name"], mesh_kwargs, tol, cache=job["cache"])
+
+    discr_key = job["discr_key"]
+    simulation(gb, discr_key, compute.get_discr()[discr_key], ".", tol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the example 1 in parallel")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threads", type=int, default=1, help="BLAS threads per worker")
+    parser.add_argument("--profile", nargs="?", const="all", default=None)
+    args = parser.parse_args()
+
+    # the workers read the phases to profile from the environment
+    if args.profile is not None:
+        os.environ["DFN_PROFILE"] = args.profile
+
+    compute.setup_custom_logger()
+    run_ensemble(get_jobs(), run, args.workers, args.threads, "ensemble_summary.csv")
+
+
+if __name__ == "__main__":
+    main()
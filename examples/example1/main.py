@@ -1,9 +1,12 @@
+import argparse
 import os
 import numpy as np
 import porepy as pp
 
 import sys; sys.path.insert(0, "../../src/")
 import discretization as compute
+import profiler
+from mesh import create_gb, copy_gb
 
 # from grid_export import grid_export
 # from flux_trace import jump_flux
@@ -31,6 +34,43 @@ def bc_flag(g, domain, tol):
     return in_flow, out_flow
 
 
+def get_mesh_sizes():
+    return {
+        "1k": 0.095,  # for 1k triangles
+        "3k": 0.8375 * np.power(2.0, -4),  # for 3k triangles
+        "10k": 0.91 * np.power(2.0, -5),  # for 10k triangles
+    }
+
+
+def simulation(gb, discr_key, discr, folder, tol):
+
+    if discr_key == "MVEM":
+        pp.coarsening.coarsen(gb, "by_volume")
+
+    domain = gb.bounding_box(as_dict=True)
+
+    param = {
+        "domain": domain,
+        "tol": tol,
+        "k": 1,
+        "diff": 1e-4,
+        "time_step": 0.05,
+        "n_steps": 300,
+        "folder": folder,
+    }
+
+    # the flow problem
+    compute.flow(gb, discr, param, bc_flag)
+
+    # if discr_key == "Tpfa":
+    #    grid_export(gb, None, folder + "/grid/")
+
+    # jump_flux(gb, param["mortar_flux"])
+
+    # the advection-diffusion problem
+    compute.advdiff(gb, discr, param, bc_flag)
+
+
 def main():
 
     input_folder = "../../geometries/example1/"
@@ -42,71 +82,53 @@ def main():
     tol = 1e-8
 
     # define the mesh sizes
-    mesh_sizes = {
-        "1k": 0.095,  # for 1k triangles
-        "3k": 0.8375 * np.power(2.0, -4),  # for 3k triangles
-        "10k": 0.91 * np.power(2.0, -5),  # for 10k triangles
-    }
+    mesh_sizes = get_mesh_sizes()
 
     for mesh_size_key in mesh_sizes.keys():
 
-        for discr_key, discr in discretizations.items():
+        #if discr_key == "MVEM":
+        #    if mesh_size_key == "1k":
+        #        mesh_size = 1 / 16
+        #    elif mesh_size_key == "3k":
+        #        mesh_size = 0.9 * np.power(2.0, -4) / 1.55
+        #    elif mesh_size_key == "10k":
+        #        mesh_size = 0.875 * np.power(2.0, -5) / 1.4
+        #else:
+        mesh_size = mesh_sizes[mesh_size_key]
+
+        mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
 
-            #if discr_key == "MVEM":
-            #    if mesh_size_key == "1k":
-            #        mesh_size = 1 / 16
-            #    elif mesh_size_key == "3k":
-            #        mesh_size = 0.9 * np.power(2.0, -4) / 1.55
-            #    elif mesh_size_key == "10k":
-            #        mesh_size = 0.875 * np.power(2.0, -5) / 1.4
-            #else:
-            mesh_size = mesh_sizes[mesh_size_key]
+        num_simul = 21
+        for simul in np.arange(1, num_simul + 1):
 
-            mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
+            file_name = input_folder + "DFN_" + str(simul) + ".fab"
 
-            num_simul = 21
-            for simul in np.arange(1, num_simul + 1):
+            # the same mesh is shared by all the discretizations
+            gb_mesh = create_gb(file_name, mesh_kwargs, tol, cache="mesh_cache")
+
+            for discr_key, discr in discretizations.items():
 
-                file_name = input_folder + "DFN_" + str(simul) + ".fab"
                 folder = (
                     "solution_" + discr_key + "_" + mesh_size_key + "_" + str(simul)
                 )
                 if not os.path.exists(folder):
                     os.makedirs(folder)
 
-                network = pp.fracture_importer.network_3d_from_fab(file_name, tol=tol)
-                gb = network.mesh(mesh_kwargs, dfn=True)
-
-                gb.remove_nodes(lambda g: g.dim == 0)
-                gb.compute_geometry()
-                gb.assign_node_ordering()
-
-                if discr_key == "MVEM":
-                    pp.coarsening.coarsen(gb, "by_volume")
-
-                domain = gb.bounding_box(as_dict=True)
-
-                param = {
-                    "domain": domain,
-                    "tol": tol,
-                    "k": 1,
-                    "diff": 1e-4,
-                    "time_step": 0.05,
-                    "n_steps": 300,
-                    "folder": folder,
-                }
-
-                # the flow problem
-                compute.flow(gb, discr, param, bc_flag)
-
-                # if discr_key == "Tpfa":
-                #    grid_export(gb, None, "grid_" + mesh_size_key + "_" + str(simul) + "/")
-
-                # jump_flux(gb, param["mortar_flux"])
-
-                # the advection-diffusion problem
-                compute.advdiff(gb, discr, param, bc_flag)
+                simulation(copy_gb(gb_mesh), discr_key, discr, folder, tol)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the example 1")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="all",
+        default=None,
+        help="phases to profile, e.g. flow.solve,transport (default all)",
+    )
+    args = parser.parse_args()
+    if args.profile is not None:
+        profiler.configure(args.profile)
+
+    compute.setup_custom_logger()
     main()
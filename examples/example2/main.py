@@ -1,9 +1,12 @@
+import argparse
 import os
 import numpy as np
 import porepy as pp
 
 import sys; sys.path.insert(0, "../../src/")
 import discretization as compute
+import profiler
+from mesh import create_gb, copy_gb
 
 # from grid_export import grid_export
 # from flux_trace import jump_flux
@@ -53,28 +56,26 @@ def main():
 
     for mesh_size_key in mesh_sizes.keys():
 
-        for discr_key, discr in discretizations.items():
+        #if discr_key == "MVEM":
+        #    if mesh_size_key == "3k":
+        #        mesh_size = 0.9 * np.power(2.0, -4) * 0.675
+        #    elif mesh_size_key == "40k":
+        #        mesh_size = 0.49 * 0.875 * np.power(2.0, -5) * 0.7
+        #else:
+        mesh_size = mesh_sizes[mesh_size_key]
+
+        mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
 
-            #if discr_key == "MVEM":
-            #    if mesh_size_key == "3k":
-            #        mesh_size = 0.9 * np.power(2.0, -4) * 0.675
-            #    elif mesh_size_key == "40k":
-            #        mesh_size = 0.49 * 0.875 * np.power(2.0, -5) * 0.7
-            #else:
-            mesh_size = mesh_sizes[mesh_size_key]
+        # the same mesh is shared by all the discretizations
+        gb_mesh = create_gb(file_name, mesh_kwargs, tol, cache="mesh_cache")
 
-            mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
+        for discr_key, discr in discretizations.items():
 
             folder = "solution_" + discr_key + "_" + mesh_size_key
             if not os.path.exists(folder):
                 os.makedirs(folder)
 
-            network = pp.fracture_importer.network_3d_from_fab(file_name, tol=tol)
-            gb = network.mesh(mesh_kwargs, dfn=True)
-
-            gb.remove_nodes(lambda g: g.dim == 0)
-            gb.compute_geometry()
-            gb.assign_node_ordering()
+            gb = copy_gb(gb_mesh)
 
             if discr_key == "MVEM":
                 pp.coarsening.coarsen(gb, "by_volume")
@@ -104,4 +105,17 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the example 2")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="all",
+        default=None,
+        help="phases to profile, e.g. flow.solve,transport (default all)",
+    )
+    args = parser.parse_args()
+    if args.profile is not None:
+        profiler.configure(args.profile)
+
+    compute.setup_custom_logger()
     main()
@@ -1,9 +1,12 @@
+import argparse
 import os
 import numpy as np
 import porepy as pp
 
 import sys; sys.path.insert(0, "../../src/")
 import discretization as compute
+import profiler
+from mesh import create_gb, copy_gb
 
 # from grid_export import grid_export
 # from flux_trace import jump_flux
@@ -82,28 +85,26 @@ def main():
     n_steps = 200
     time_step = end_time / n_steps
 
+    #if discr_key == "MVEM":
+    #    mesh_size = 0.17 * 1e2
+    #else:
+    mesh_size = 1e2
+
+    mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
+
+    # the same mesh is shared by all the boundary conditions and discretizations
+    gb_mesh = create_gb(file_name, mesh_kwargs, tol, cache="mesh_cache")
+
     bc_types = {"same": bc_same, "different": bc_different}
     for bc_type_key, bc_type in bc_types.items():
 
         for discr_key, discr in discretizations.items():
 
-            #if discr_key == "MVEM":
-            #    mesh_size = 0.17 * 1e2
-            #else:
-            mesh_size = 1e2
-
-            mesh_kwargs = {"mesh_size_frac": mesh_size, "mesh_size_min": mesh_size / 20}
-
             folder = "solution_" + discr_key + "_" + bc_type_key
             if not os.path.exists(folder):
                 os.makedirs(folder)
 
-            network = pp.fracture_importer.network_3d_from_fab(file_name, tol=tol)
-            gb = network.mesh(mesh_kwargs, dfn=True)
-
-            gb.remove_nodes(lambda g: g.dim == 0)
-            gb.compute_geometry()
-            gb.assign_node_ordering()
+            gb = copy_gb(gb_mesh)
 
             #if discr_key == "MVEM":
             #    pp.coarsening.coarsen(gb, "by_volume")
@@ -140,4 +141,17 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the example 3")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="all",
+        default=None,
+        help="phases to profile, e.g. flow.solve,transport (default all)",
+    )
+    args = parser.parse_args()
+    if args.profile is not None:
+        profiler.configure(args.profile)
+
+    compute.setup_custom_logger()
     main()
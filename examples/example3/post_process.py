@@ -77,6 +77,31 @@ def write_csv(file_out, fields, data):
 
 #------------------------------------------------------------------------------#
 
+def cot_insitu(folder_in, num_frac):
+
+    # statistics computed during the simulation, if available
+    cot = []
+    for name in ["Cmean", "Cmin", "Cmax"]:
+        file_in = folder_in + name + ".csv"
+        if not os.path.exists(file_in):
+            return None
+
+        # the header gives the fracture id of each column, after the time
+        with open(file_in) as f:
+            frac_id = np.array(f.readline().strip().split(",")[1:], dtype=np.int)
+        data = np.loadtxt(file_in, delimiter=",", ndmin=2, skiprows=1)[:, 1:]
+
+        # fill the columns by fracture id, as in cot_domain
+        is_loc = frac_id < num_frac
+        c = np.full((data.shape[0], num_frac), np.nan)
+        c[:, frac_id[is_loc]] = data[:, is_loc]
+        cot.append(c)
+
+    zero = 273.15
+    return [c + zero for c in cot]
+
+#------------------------------------------------------------------------------#
+
 def cot_domain(file_in, step, field, num_frac, padding=6):
 
     cot_avg = np.zeros((step, num_frac))
@@ -127,7 +152,10 @@ def main():
             # in this file the constant data are saved
             file_in = folder_in + "solution_2_"
 
-            cot_avg, cot_min, cot_max = cot_domain(file_in, n_step, field, num_frac)
+            cot = cot_insitu(folder_in, num_frac)
+            if cot is None:
+                cot = cot_domain(file_in, n_step, field, num_frac)
+            cot_avg, cot_min, cot_max = cot
 
             times = np.arange(n_step) * time_step
             labels = np.arange(num_frac).astype(np.str)
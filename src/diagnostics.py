@@ -0,0 +1,101 @@
+import json
+import time
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+import porepy as pp
+
+import timing
+
+# ------------------------------------------------------------------------------#
+
+
+def block_report(A, assembler):
+    # description of the blocks of the assembler and number of non-zeros of each
+    # non-empty pair of blocks
+    num_blocks = len(assembler.full_dof)
+    offset = np.cumsum(np.r_[0, assembler.full_dof]).astype(int)
+    block_of = np.repeat(np.arange(num_blocks), assembler.full_dof)
+
+    blocks = [None] * num_blocks
+    for (g, var), bi in assembler.block_dof.items():
+        block = {"block": bi, "variable": var, "dof": int(assembler.full_dof[bi])}
+        block["first_dof"] = int(offset[bi])
+        if isinstance(g, pp.Grid):
+            block["kind"] = "grid"
+            block["dim"] = g.dim
+            if g.dim == 2:
+                block["frac_num"] = int(g.frac_num)
+        else:  # This is really an edge
+            block["kind"] = "mortar"
+            block["dim"] = min(g_e.dim for g_e in g)
+        blocks[bi] = block
+
+    coo = A.tocoo()
+    pairs = block_of[coo.row] * num_blocks + block_of[coo.col]
+    pairs, nnz = np.unique(pairs, return_counts=True)
+    block_nnz = np.vstack((pairs // num_blocks, pairs % num_blocks, nnz)).T
+
+    return blocks, block_nnz
+
+
+# ------------------------------------------------------------------------------#
+
+
+def matrix_report(A, assembler=None, lu=True, condition=True):
+    # size, sparsity, bandwidth, symmetry, fill-in of the LU factorization and an
+    # estimate of the 1-norm condition number of the matrix
+    # work on a copy, the caller's matrix must keep its sparsity pattern
+    A = A.tocsr(copy=True)
+    A.eliminate_zeros()
+    coo = A.tocoo()
+
+    report = {
+        "shape": A.shape,
+        "nnz": A.nnz,
+        "nnz_per_row": A.nnz / max(A.shape[0], 1),
+        "bandwidth": int(np.amax(np.abs(coo.row - coo.col))) if A.nnz else 0,
+    }
+
+    pattern = sps.csr_matrix((np.ones(A.nnz), (coo.row, coo.col)), shape=A.shape)
+    report["symmetric_pattern"] = (pattern - pattern.T).nnz == 0
+    norm_max = np.amax(np.abs(A.data)) if A.nnz else 0
+    asym = abs(A - A.T)
+    report["asymmetry"] = float(asym.max() / norm_max) if norm_max > 0 else 0.0
+
+    if assembler is not None:
+        report["blocks"], report["block_nnz"] = block_report(A, assembler)
+
+    if lu:
+        start = time.perf_counter()
+        factor = spla.splu(A.tocsc())
+        report["lu_time"] = time.perf_counter() - start
+        report["lu_nnz"] = factor.L.nnz + factor.U.nnz
+        report["lu_fill_in"] = report["lu_nnz"] / A.nnz
+
+        if condition:
+            # the 1-norm of A is computed exactly, the one of its inverse estimated
+            norm = np.amax(np.asarray(abs(A).sum(axis=0)))
+            inv = spla.LinearOperator(
+                A.shape,
+                matvec=factor.solve,
+                rmatvec=lambda x: factor.solve(x, trans="T"),
+                dtype=A.dtype,
+            )
+            report["norm_1"] = float(norm)
+            report["condition_1"] = float(norm * spla.onenormest(inv))
+
+    return report
+
+
+# ------------------------------------------------------------------------------#
+
+
+def write(A, assembler, file_name, lu=True, condition=True):
+    report = matrix_report(A, assembler, lu, condition)
+    with open(file_name, "w") as f:
+        json.dump(report, f, indent=2, default=timing.to_json)
+    return report
+
+
+# ------------------------------------------------------------------------------#
@@ -3,25 +3,42 @@ import scipy.sparse as sps
 import numpy as np
 import porepy as pp
 
+import diagnostics
+import export
+import flux_trace
+import memory
+import profiler
+import series
+import solver
+import timing
 
-def setup_custom_logger():
+
+def setup_custom_logger(file_name="log.txt", screen=True):
     formatter = logging.Formatter(
         fmt="%(asctime)s %(levelname)-8s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
     )
-    handler = logging.FileHandler("log.txt", mode="w")
+    handler = logging.FileHandler(file_name, mode="w")
     handler.setFormatter(formatter)
-    screen_handler = logging.StreamHandler(stream=sys.stdout)
-    screen_handler.setFormatter(formatter)
 
     logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
 
+    # remove the previous handlers, so the logger can be redirected for each run
+    for old_handler in list(logger.handlers):
+        logger.removeHandler(old_handler)
+        old_handler.close()
+
     logger.addHandler(handler)
-    logger.addHandler(screen_handler)
+    if screen:
+        screen_handler = logging.StreamHandler(stream=sys.stdout)
+        screen_handler.setFormatter(formatter)
+        logger.addHandler(screen_handler)
     return logger
 
 
-logger = setup_custom_logger()
+# the log file is opened by the drivers, importing the module (as the spawned
+# workers do) must not truncate it
+logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------------------#
 
@@ -127,7 +144,7 @@ def data_flow(gb, discr, model, data, bc_flag):
 # ------------------------------------------------------------------------------#
 
 
-def flow(gb, discr, param, bc_flag):
+def setup_flow(gb, discr, param, bc_flag):
 
     model = "flow"
 
@@ -178,16 +195,15 @@ def flow(gb, discr, param, bc_flag):
     # solution of the darcy problem
     assembler = pp.Assembler(gb)
 
-    logger.info("Assemble the flow problem")
-    A, b = assembler.assemble_matrix_rhs()
-    logger.info("done")
+    return assembler, discr_scheme, model_data, variable
 
-    logger.info("Solve the linear system")
-    x = sps.linalg.spsolve(A, b)
-    logger.info("done")
 
-    logger.info("Variable post-process")
-    assembler.distribute_variable(x)
+# ------------------------------------------------------------------------------#
+
+
+def extract_flow(gb, discr_scheme, variable, param):
+    pressure = param["pressure"]
+    flux = param["flux"]
 
     # extract the pressure from the solution
     for g, d in gb:
@@ -198,23 +214,157 @@ def flow(gb, discr, param, bc_flag):
             d[pp.STATE][pressure] = np.zeros(g.num_cells)
             d[pp.STATE][flux] = np.zeros(g.num_faces)
 
-    # export the P0 flux reconstruction only for some scheme
-    if discr["scheme"] is pp.MVEM or discr["scheme"] is pp.RT0:
-        P0_flux = "P0_flux"
-        param["P0_flux"] = P0_flux
-        pp.project_flux(gb, discr_scheme, flux, P0_flux, mortar)
+
+# ------------------------------------------------------------------------------#
+
+
+def flow(gb, discr, param, bc_flag):
+
+    # the hybrid solver requires a mixed scheme
+    mixed = discr["scheme"] is pp.MVEM or discr["scheme"] is pp.RT0
+    if param.get("solver", "direct") == "hybrid" and not mixed:
+        raise ValueError("The hybrid solver is only for the RT0 and MVEM schemes")
+
+    timer = timing.Timer("flow")
+    if param.get("memory_trace", False):
+        memory.tracer.start()
+    # a new simulation on the grid bucket, the transport adds to the same report
+    memory.tracer.reset(keep=["meshing"])
+    if param.get("profile", None) is not None:
+        profiler.configure(param["profile"])
+
+    with timer.phase("setup"), memory.stage("flow.data_flow"):
+        assembler, discr_scheme, _, variable = setup_flow(gb, discr, param, bc_flag)
+    flux = param["flux"]
+    mortar = param["mortar_flux"]
+
+    # the assembly includes the discretization of the operators
+    logger.info("Assemble the flow problem")
+    with timer.phase("assembly"), memory.stage("flow.assembly"):
+        A, b = assembler.assemble_matrix_rhs()
+    logger.info("done")
+
+    if param.get("diagnostics", False):
+        logger.info("Save the diagnostics of the flow matrix on file")
+        file_out = param["folder"] + "/diagnostics_flow.json"
+        diagnostics.write(A, assembler, file_out)
+        logger.info("done")
+
+    logger.info("Solve the linear system with " + param.get("solver", "direct"))
+    with timer.phase("solve"), memory.stage("flow.solve"):
+        x = solver.solve(A, b, assembler, param)
+    logger.info("done")
+
+    logger.info("Variable post-process")
+    with timer.phase("distribute"):
+        assembler.distribute_variable(x)
+
+    with timer.phase("post_process"):
+        extract_flow(gb, discr_scheme, variable, param)
+
+        # export the P0 flux reconstruction only for some scheme
+        if mixed:
+            P0_flux = "P0_flux"
+            param["P0_flux"] = P0_flux
+            pp.project_flux(gb, discr_scheme, flux, P0_flux, mortar)
 
     logger.info("done")
 
     logger.info("Save dof on file")
+    dof = get_dof(assembler)
     file_out = param["folder"] + "/dof_flow.csv"
-    np.savetxt(file_out, get_dof(assembler), delimiter=",", fmt="%d")
+    np.savetxt(file_out, dof, delimiter=",", fmt="%d")
+    logger.info("done")
+
+    logger.info("Save performance manifest on file")
+    file_out = param["folder"] + "/perf_flow.json"
+    timer.write(
+        file_out,
+        scheme=discr["scheme"].__name__,
+        solver=param.get("solver", "direct"),
+        dof=dof,
+        shape=A.shape,
+        nnz=A.nnz,
+    )
+    memory.write(param["folder"] + "/memory.json")
+    profiler.write(param["folder"] + "/profile_flow.folded")
     logger.info("done")
 
 
 # ------------------------------------------------------------------------------#
 
 
+def bc_values_flow(g, data):
+    # boundary values of the flow problem, the inflow faces are the ones flagged
+    # by data_flow and the values can be given per fracture in data["bc_values"]
+    bc_values = data.get("bc_values", {})
+    if g.dim == 2 and int(g.frac_num) in bc_values:
+        return bc_values[int(g.frac_num)]
+
+    bc_val = np.zeros(g.num_faces)
+    if g.tags["domain_boundary_faces"].any():
+        bc_val[g.tags["bc_flow_id"] == 1] = data.get("bc_flow", 1)
+    return bc_val
+
+
+# ------------------------------------------------------------------------------#
+
+
+def flow_multi(gb, discr, param, bc_flag, scenarios):
+    # solve the flow problem for many boundary values with the same matrix, each
+    # scenario is a dictionary that overrides "bc_flow" and/or "bc_values" of param
+
+    assembler, discr_scheme, model_data, variable = setup_flow(gb, discr, param, bc_flag)
+    pressure = param["pressure"]
+    flux = param["flux"]
+    mortar = param["mortar_flux"]
+
+    logger.info("Assemble the flow problem")
+    A, b = assembler.assemble_matrix_rhs()
+    logger.info("done")
+
+    # the boundary values enter only the right-hand side of the fracture blocks,
+    # update them by the difference with respect to the assembled one
+    logger.info("Assemble the right-hand sides of " + str(len(scenarios)) + " scenarios")
+    dof = solver.block_indices(assembler)
+    grids = [(g, d) for g, d in gb if g.dim == 2]
+    rhs = {g: discr_scheme.assemble_rhs(g, d) for g, d in grids}
+
+    # keep the assembled boundary values, to restore them at the end
+    bc_values = {g: d[pp.PARAMETERS][model_data]["bc_values"] for g, d in grids}
+
+    B = np.tile(b[:, np.newaxis], (1, len(scenarios)))
+    for i, scenario in enumerate(scenarios):
+        data = dict(param, **scenario)
+        for g, d in grids:
+            d[pp.PARAMETERS][model_data]["bc_values"] = bc_values_flow(g, data)
+            B[dof[(g, variable)], i] += discr_scheme.assemble_rhs(g, d) - rhs[g]
+
+    for g, d in grids:
+        d[pp.PARAMETERS][model_data]["bc_values"] = bc_values[g]
+    logger.info("done")
+
+    logger.info("Factorize and solve the linear system for all the scenarios")
+    X = solver.factorize(A, param, assembler).solve(B)
+    logger.info("done")
+
+    logger.info("Variable post-process")
+    solutions = []
+    for i in np.arange(len(scenarios)):
+        assembler.distribute_variable(X[:, i])
+        extract_flow(gb, discr_scheme, variable, param)
+
+        sol = {g: {key: d[pp.STATE][key] for key in [pressure, flux]} for g, d in gb}
+        sol.update({e: {mortar: d[pp.STATE][mortar]} for e, d in gb.edges()})
+        solutions.append(sol)
+    logger.info("done")
+
+    return solutions
+
+
+# ------------------------------------------------------------------------------#
+
+
 def data_advdiff(gb, model, data, bc_flag):
     tol = data["tol"]
 
@@ -312,9 +462,16 @@ def advdiff(gb, discr, param, bc_flag):
 
     model = "transport"
 
-    model_data_adv, model_data_diff, model_data_src = data_advdiff(
-        gb, model, param, bc_flag
-    )
+    timer = timing.Timer("transport")
+    if param.get("memory_trace", False):
+        memory.tracer.start()
+    if param.get("profile", None) is not None:
+        profiler.configure(param["profile"])
+
+    with timer.phase("setup"), memory.stage("transport.data"):
+        model_data_adv, model_data_diff, model_data_src = data_advdiff(
+            gb, model, param, bc_flag
+        )
 
     # discretization operator names
     adv_id = "advection"
@@ -383,7 +540,8 @@ def advdiff(gb, discr, param, bc_flag):
     # setup the advection-diffusion problem
     assembler = pp.Assembler(gb, active_variables=[variable, mortar_diff, mortar_adv])
     logger.info("Assemble the advective and diffusive terms of the transport problem")
-    block_A, block_b = assembler.assemble_matrix_rhs(add_matrices=False)
+    with timer.phase("assembly"), memory.stage("transport.assembly"):
+        block_A, block_b = assembler.assemble_matrix_rhs(add_matrices=False)
     logger.info("done")
 
     # unpack the matrices just computed
@@ -406,18 +564,49 @@ def advdiff(gb, discr, param, bc_flag):
     M_t = M.copy() / param["time_step"] * param.get("mass_weight", 1)
     M_r = M.copy() * param.get("reaction", 0)
 
-    # Perform an LU factorization to speedup the solver
-    IE_solver = sps.linalg.factorized((M_t + A + M_r).tocsc())
-
-    # time loop
-    logger.info("Prepare the exporting")
-    save = pp.Exporter(gb, "solution", folder=param["folder"])
+    # Perform an LU factorization, or build the preconditioner, to speedup the solver
+    logger.info("Factorize the transport problem")
+    with timer.phase("factorization"), memory.stage("transport.factorization"):
+        S = (M_t + A + M_r).tocsc()
+        if param.get("transport_solver", "direct") == "dd":
+            # gmres with the domain decomposition preconditioner
+            dd_param = dict(param, precond="schwarz")
+            IE_solver = solver.KrylovSolver(S, assembler, dd_param)
+        else:
+            IE_solver = solver.factorize(S, param, assembler)
     logger.info("done")
 
+    if param.get("diagnostics", False):
+        logger.info("Save the diagnostics of the transport matrix on file")
+        file_out = param["folder"] + "/diagnostics_transport.json"
+        diagnostics.write(S, assembler, file_out)
+        logger.info("done")
+
     variables = [variable, param["pressure"], "frac_num", "cell_volumes"]
     if discr["scheme"] is pp.MVEM or discr["scheme"] is pp.RT0:
         variables.append(param["P0_flux"])
 
+    # time loop
+    logger.info("Prepare the exporting")
+    export_steps = export.export_steps(param)
+    with timer.phase("export_setup"), memory.stage("transport.export"):
+        if param.get("export_format", "vtk") == "series":
+            save = series.SeriesWriter(
+                gb, "solution", param["folder"], variables, [variable], export_steps.size
+            )
+        else:
+            save = export.Writer(
+                gb,
+                "solution",
+                param["folder"],
+                variables,
+                [variable],
+                asynchronous=param.get("export_async", False),
+                max_queue=param.get("export_queue", 2),
+            )
+    export_steps = set(export_steps)
+    logger.info("done")
+
     # assign the initial condition
     x = np.zeros(A.shape[0])
     assembler.distribute_variable(x)
@@ -427,28 +616,84 @@ def advdiff(gb, discr, param, bc_flag):
 
     x = assembler.merge_variable(variable)
 
-    outflow = np.zeros(param["n_steps"])
+    # restriction of the global vector to the cells of the 2d grids
+    dof = solver.block_indices(assembler)
+    cells = np.hstack([dof[(g, variable)] for g, _ in gb if g.dim == 2])
+    restrict = sps.csr_matrix(
+        (np.ones(cells.size), (np.arange(cells.size), cells)), shape=(cells.size, x.size)
+    )
 
-    logger.info("Start the time loop with " + str(param["n_steps"]) + " steps")
-    for i in np.arange(param["n_steps"]):
-        logger.info("Solve the linear system for time step " + str(i))
-        x = IE_solver(b + M_t.dot(x))
-        logger.info("done")
+    # the flux is fixed, the production is then a linear function of the scalar
+    logger.info("Compute the outflow operator")
+    with timer.phase("outflow_setup"):
+        outflow_op = outflow_operator(gb, param)
+        sps.save_npz(param["folder"] + "/outflow_operator.npz", outflow_op)
+        outflow_op = outflow_op * restrict
+    logger.info("done")
 
-        logger.info("Variable post-process")
-        assembler.distribute_variable(x)
-        logger.info("done")
+    outflow = np.zeros(param["n_steps"])
 
-        logger.info("Export variable")
-        save.write_vtk(variables, time_step=i)
+    # the mismatch of the flux on each trace is a linear function of the mortars
+    if param.get("mismatch", False):
+        logger.info("Compute the mismatch operator")
+        with timer.phase("mismatch_setup"):
+            mortars = [mortar_adv, mortar_diff]
+            mismatch_op = flux_trace.mismatch_operator(gb, assembler, mortars)
+            mismatch = np.zeros((param["n_steps"], mismatch_op.shape[0]))
         logger.info("done")
 
-        logger.info("Compute the production")
-        outflow[i] = compute_outflow(gb, param)
-        logger.info("done")
+    # statistics of the scalar for each fracture
+    logger.info("Compute the fracture index of the cells")
+    frac_index = fracture_index(gb)
+    num_frac = frac_index["frac_num"].size
+    c_mean = np.zeros((param["n_steps"], num_frac))
+    c_min = np.zeros((param["n_steps"], num_frac))
+    c_max = np.zeros((param["n_steps"], num_frac))
+    logger.info("done")
+
+    logger.info("Start the time loop with " + str(param["n_steps"]) + " steps")
+    with memory.stage("transport.time_loop"):
+        for i in np.arange(param["n_steps"]):
+            logger.info("Solve the linear system for time step " + str(i))
+            with timer.phase("solve"):
+                x = IE_solver(b + M_t.dot(x))
+            logger.info("done")
+
+            logger.info("Variable post-process")
+            with timer.phase("distribute"):
+                assembler.distribute_variable(x)
+            logger.info("done")
+
+            if i in export_steps:
+                logger.info("Export variable")
+                with timer.phase("export"), memory.stage("transport.export"):
+                    save.write(i)
+                logger.info("done")
+
+            logger.info("Compute the production")
+            with timer.phase("outflow"):
+                outflow[i] = outflow_op.dot(x)[0]
+            logger.info("done")
+
+            logger.info("Compute the statistics on the fractures")
+            with timer.phase("statistics"):
+                c_mean[i], c_min[i], c_max[i] = fracture_stats(x[cells], frac_index)
+            logger.info("done")
+
+            if param.get("mismatch", False):
+                logger.info("Compute the mismatch on the traces")
+                with timer.phase("mismatch"):
+                    mismatch[i] = mismatch_op.dot(x)
+                logger.info("done")
+
+    if isinstance(IE_solver, solver.KrylovSolver):
+        IE_solver.close()
 
     time = np.arange(param["n_steps"]) * param["time_step"]
-    save.write_pvd(time)
+    logger.info("Wait for the exporting")
+    with timer.phase("export_close"), memory.stage("transport.export"):
+        save.close(time)
+    logger.info("done")
 
     logger.info("Save outflow on file")
     file_out = param["folder"] + "/outflow.csv"
@@ -456,34 +701,121 @@ def advdiff(gb, discr, param, bc_flag):
     np.savetxt(file_out, data, delimiter=",")
     logger.info("done")
 
+    logger.info("Save the statistics on the fractures on file")
+    # the header gives the fracture id of each column, the ids may not be contiguous
+    header = ",".join(["time"] + [str(int(f)) for f in frac_index["frac_num"]])
+    for name, c in zip(["Cmean", "Cmin", "Cmax"], [c_mean, c_min, c_max]):
+        file_out = param["folder"] + "/" + name + ".csv"
+        data = np.insert(c, 0, time, axis=1)
+        np.savetxt(file_out, data, delimiter=",", header=header, comments="")
+    logger.info("done")
+
+    if param.get("mismatch", False):
+        logger.info("Save the mismatch on the traces on file")
+        file_out = param["folder"] + "/mismatch.csv"
+        np.savetxt(file_out, np.insert(mismatch, 0, time, axis=1), delimiter=",")
+        logger.info("done")
+
     logger.info("Save dof on file")
+    dof = get_dof(assembler)
     file_out = param["folder"] + "/dof_transport.csv"
-    np.savetxt(file_out, get_dof(assembler), delimiter=",", fmt="%d")
+    np.savetxt(file_out, dof, delimiter=",", fmt="%d")
+    logger.info("done")
+
+    logger.info("Save performance manifest on file")
+    file_out = param["folder"] + "/perf_transport.json"
+    timer.write(
+        file_out,
+        scheme=discr["scheme"].__name__,
+        n_steps=param["n_steps"],
+        dof=dof,
+        shape=S.shape,
+        nnz=S.nnz,
+    )
+    memory.write(param["folder"] + "/memory.json")
+    profiler.write(param["folder"] + "/profile_transport.folded")
     logger.info("done")
 
 
 # ------------------------------------------------------------------------------#
 
 
+def outflow_weights(g, d, param):
+    # weights of the cells such that the production of the grid is their dot
+    # product with the scalar, they depend only on the geometry and on the flux
+    faces, cells, sign = sps.find(g.cell_faces)
+    index = np.argsort(cells)
+    faces, sign = faces[index], sign[index]
+
+    flux = d[pp.STATE][param["flux"]].copy()
+
+    flux[faces] *= sign
+    flux[g.get_internal_faces()] = 0
+    flux[flux < 0] = 0
+    # weights = np.abs(g.cell_faces).T.dot(flux)
+
+    flux[flux != 0] = 1
+    return np.abs(g.cell_faces).T.dot(flux * g.face_areas)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def outflow_operator(gb, param):
+    # row vector that computes the production from the scalar of the 2d grids,
+    # concatenated in the same order as the exported solution
+    weights = [outflow_weights(g, d, param) for g, d in gb if g.dim == 2]
+    return sps.csr_matrix(np.hstack(weights))
+
+
+# ------------------------------------------------------------------------------#
+
+
+def fracture_index(gb):
+    # map the cells of the 2d grids, concatenated as in the exported solution, to
+    # their fracture, so the statistics can be computed with whole-array operations
+    frac_num = np.hstack([d["frac_num"] for g, d in gb if g.dim == 2])
+    volumes = np.hstack([g.cell_volumes for g, _ in gb if g.dim == 2])
+
+    frac_num, index = np.unique(frac_num, return_inverse=True)
+    order = np.argsort(index, kind="stable")
+    start = np.r_[0, np.cumsum(np.bincount(index))[:-1]]
+
+    return {
+        "frac_num": frac_num,
+        "index": index,
+        "volumes": volumes,
+        "volume": np.bincount(index, weights=volumes),
+        "order": order,
+        "start": start,
+    }
+
+
+# ------------------------------------------------------------------------------#
+
+
+def fracture_stats(c, frac_index):
+    # volume weighted mean, minimum and maximum of c for each fracture
+    index = frac_index["index"]
+    c_mean = np.bincount(index, weights=c * frac_index["volumes"]) / frac_index["volume"]
+
+    c_sorted = c[frac_index["order"]]
+    c_min = np.minimum.reduceat(c_sorted, frac_index["start"])
+    c_max = np.maximum.reduceat(c_sorted, frac_index["start"])
+
+    return c_mean, c_min, c_max
+
+
+# ------------------------------------------------------------------------------#
+
+
 def compute_outflow(gb, param):
     outflow = 0.0
     for g, d in gb:
         if g.dim < 2:
             continue
-        faces, cells, sign = sps.find(g.cell_faces)
-        index = np.argsort(cells)
-        faces, sign = faces[index], sign[index]
-
-        flux = d[pp.STATE][param["flux"]].copy()
         scalar = d[pp.STATE][param["scalar"]]
-
-        flux[faces] *= sign
-        flux[g.get_internal_faces()] = 0
-        flux[flux < 0] = 0
-        # outflow += np.dot(flux, np.abs(g.cell_faces).dot(scalar))
-
-        flux[flux != 0] = 1
-        outflow += np.dot(flux * g.face_areas, np.abs(g.cell_faces).dot(scalar))
+        outflow += np.dot(outflow_weights(g, d, param), scalar)
 
     return outflow
 
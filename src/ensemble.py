@@ -0,0 +1,120 @@
+import concurrent.futures
+import csv
+import logging
+import multiprocessing
+import os
+import time
+
+import discretization as compute
+
+logger = logging.getLogger(__name__)
+
+# environment variables read by the BLAS/OpenMP libraries at import time
+THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+# ------------------------------------------------------------------------------#
+
+
+def pin_threads(num_threads):
+    # limit the threads used by each worker, the environment is already set when
+    # the worker starts but the libraries loaded so far are limited as well
+    for var in THREAD_VARIABLES:
+        os.environ[var] = str(num_threads)
+
+    try:
+        import threadpoolctl
+
+        threadpoolctl.threadpool_limits(num_threads)
+    except ImportError:
+        pass
+
+
+# ------------------------------------------------------------------------------#
+
+
+def run_job(run, job):
+    # execute a single job in its own folder and with its own log file, the
+    # relative paths of the job are then relative to its folder
+    folder = os.path.abspath(job["folder"])
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    cwd = os.getcwd()
+    os.chdir(folder)
+    compute.setup_custom_logger("log.txt", screen=False)
+
+    status = "done"
+    start = time.time()
+    try:
+        run(job)
+    except Exception:
+        logger.exception("Job " + job["name"] + " failed")
+        status = "failed"
+    wall_time = time.time() - start
+
+    os.chdir(cwd)
+    return job["name"], status, wall_time
+
+
+# ------------------------------------------------------------------------------#
+
+
+def run_ensemble(jobs, run, num_workers=1, num_threads=1, file_out=None):
+    # run the jobs, each a dictionary with at least "name" and "folder", in a pool
+    # of processes and return the wall time of each of them
+    env = {var: os.environ.get(var) for var in THREAD_VARIABLES}
+    for var in THREAD_VARIABLES:
+        os.environ[var] = str(num_threads)
+
+    logger.info(
+        "Run " + str(len(jobs)) + " jobs with " + str(num_workers) + " workers and "
+        + str(num_threads) + " threads each"
+    )
+
+    # spawn the workers so that they load the BLAS libraries with the limits
+    context = multiprocessing.get_context("spawn")
+    summary = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=pin_threads,
+            initargs=(num_threads,),
+        ) as executor:
+            futures = [executor.submit(run_job, run, job) for job in jobs]
+            for future in concurrent.futures.as_completed(futures):
+                name, status, wall_time = future.result()
+                logger.info("Job " + name + " " + status + " in " + str(wall_time) + "s")
+                summary.append((name, status, wall_time))
+    finally:
+        for var, value in env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+    # report the jobs in the same order they have been given
+    order = {job["name"]: i for i, job in enumerate(jobs)}
+    summary.sort(key=lambda s: order[s[0]])
+
+    width = max([len(s[0]) for s in summary] + [len("job")])
+    table = ["job".ljust(width) + "  status  wall time [s]"]
+    table += [s[0].ljust(width) + "  " + s[1].ljust(6) + "  %.2f" % s[2] for s in summary]
+    logger.info("Summary of the ensemble\n" + "\n".join(table))
+
+    if file_out is not None:
+        with open(file_out, "w") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["job", "status", "wall_time"])
+            writer.writerows(summary)
+
+    return summary
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,108 @@
+import logging
+import queue
+import threading
+import numpy as np
+import porepy as pp
+
+from mesh import copy_gb
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------#
+
+
+def export_steps(param):
+    # time steps to export: all of them by default, every param["export_every"]
+    # steps and the last one, the closest to the times in param["export_times"], or
+    # none if param["export"] is False
+    n_steps = param["n_steps"]
+    if not param.get("export", True):
+        return np.empty(0, dtype=int)
+
+    if param.get("export_times", None) is not None:
+        time = np.arange(n_steps) * param["time_step"]
+        steps = [np.argmin(np.abs(time - t)) for t in param["export_times"]]
+        return np.unique(steps)
+
+    steps = np.arange(0, n_steps, param.get("export_every", 1))
+    # always export the final state
+    return np.union1d(steps, [n_steps - 1]) if n_steps > 0 else steps
+
+
+# ------------------------------------------------------------------------------#
+
+
+class Writer(object):
+    # export of the time dependent variables, if asynchronous the files are written
+    # by a background thread that works on its own copy of the grid bucket, at most
+    # max_queue snapshots are waiting to be written
+
+    def __init__(self, gb, file_name, folder, variables, dynamic, asynchronous=False,
+                 max_queue=2):
+        self.variables = variables
+        self.dynamic = dynamic
+        self.steps = []
+
+        self.gb = gb
+        self.queue = None
+        self.error = None
+
+        if asynchronous:
+            # the constant variables are already in the copied state
+            self.gb = copy_gb(gb)
+            self.source = gb
+            self.queue = queue.Queue(maxsize=max_queue)
+            self.thread = threading.Thread(target=self._run)
+            self.thread.daemon = True
+            self.thread.start()
+
+        self.save = pp.Exporter(self.gb, file_name, folder=folder)
+
+    def write(self, step):
+        self.steps.append(step)
+
+        if self.queue is None:
+            self.save.write_vtk(self.variables, time_step=step)
+            return
+
+        self._check()
+        snapshot = [
+            {var: d[pp.STATE][var].copy() for var in self.dynamic}
+            for _, d in self.source
+        ]
+        self.queue.put((step, snapshot))
+
+    def close(self, time):
+        # wait for the pending snapshots and write the pvd file of the exported steps
+        if self.queue is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self._check()
+
+        if self.steps:
+            steps = np.array(self.steps)
+            self.save.write_pvd(time[steps], file_extension=steps)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+
+            step, snapshot = item
+            try:
+                for (_, d), values in zip(self.gb, snapshot):
+                    d[pp.STATE].update(values)
+                self.save.write_vtk(self.variables, time_step=step)
+            except Exception as err:
+                logger.exception("Export of time step " + str(step) + " failed")
+                self.error = err
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+
+# ------------------------------------------------------------------------------#
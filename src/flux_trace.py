@@ -1,20 +1,87 @@
-def jump_flux(gb, flux_mortar):
+import numpy as np
+import scipy.sparse as sps
+import porepy as pp
 
+import solver
+
+
+def mortar_projector(gb):
+    # the edges of the 1d grids in a fixed order and the stacked projector from the
+    # concatenated mortar vector of these edges to the cells of all the 1d grids,
+    # which sums the mortar cells on the same 1d cell, and the sum on each trace
+    traces = list(gb.grids_of_dimension(1))
+    edges = []
+    rows, cols, data = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)], [np.empty(0)]
+
+    num_cells, num_mortar = 0, 0
     # loop on the lagrange multiplier nodes
-    for g in gb.grids_of_dimension(1):
+    for g in traces:
 
         # loop on the associated edges
-        for _, d_e in gb.edges_of_node(g):
+        for e, d_e in gb.edges_of_node(g):
 
             # get the projector from the mortar grid to the slave
-            proj = d_e["mortar_grid"].mortar_to_slave_int()
+            proj = d_e["mortar_grid"].mortar_to_slave_int().tocoo()
+            rows.append(proj.row + num_cells)
+            cols.append(proj.col + num_mortar)
+            data.append(proj.data)
+
+            edges.append(e)
+            num_mortar += proj.shape[1]
+
+        num_cells += g.num_cells
+
+    cell_proj = sps.csr_matrix(
+        (np.hstack(data), (np.hstack(rows), np.hstack(cols))),
+        shape=(num_cells, num_mortar),
+    )
+
+    trace = np.repeat(np.arange(len(traces)), [g.num_cells for g in traces])
+    trace_sum = sps.csr_matrix(
+        (np.ones(num_cells), (trace, np.arange(num_cells))),
+        shape=(len(traces), num_cells),
+    )
+
+    return {
+        "traces": traces,
+        "edges": edges,
+        "cell_proj": cell_proj,
+        "trace_sum": trace_sum,
+    }
+
+
+def jump_flux(gb, flux_mortar, proj=None):
+    # the jump of the flux on each cell of the 1d grids, i.e. the sum of the mortar
+    # variable of all the fractures through the 1d object, and its sum on each trace
+    if proj is None:
+        proj = mortar_projector(gb)
+
+    flux = [gb.edge_props(e)[pp.STATE][flux_mortar] for e in proj["edges"]]
+    jump = proj["cell_proj"].dot(np.hstack(flux))
+
+    return jump, proj["trace_sum"].dot(jump)
+
+
+def mismatch_operator(gb, assembler, variables, proj=None):
+    # linear operator from the global vector of the assembler to the flux mismatch
+    # on each trace, the mortar variables of the list are summed
+    if proj is None:
+        proj = mortar_projector(gb)
 
-            # project the mortar variable from the mortar grid to the 1d
-            # grid by thus doing the sum on the same 1d-cell
-            # the variable now contains the jump of the flux from the current 2d
-            # fracture to thourgh the 1d object.
-            jump_flux = proj.dot(d_e[flux_mortar])
+    dof = solver.block_indices(assembler)
+    rows, cols = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)]
+    num_mortar = 0
+    for e in proj["edges"]:
+        num_cells = gb.edge_props(e, "mortar_grid").num_cells
+        for variable in variables:
+            rows.append(num_mortar + np.arange(num_cells))
+            cols.append(dof[(e, variable)])
+        num_mortar += num_cells
 
-            print(jump_flux)
+    rows, cols = np.hstack(rows), np.hstack(cols)
+    num_dof = int(np.sum(assembler.full_dof))
+    restrict = sps.csr_matrix(
+        (np.ones(rows.size), (rows, cols)), shape=(num_mortar, num_dof)
+    )
 
-        print("----")
+    return proj["trace_sum"] * proj["cell_proj"] * restrict
@@ -1,104 +1,202 @@
+import concurrent.futures
+import glob
+import json
+import multiprocessing
 import numpy as np
 import os
 import porepy as pp
 
 
-def grid_export(gb, P0_flux, folder):
+def compressed_to_ij(A):
+    # return the pairs (index of the compressed axis, stored index) of a csc or csr
+    # matrix, in the order they are stored
+    indptr, indices = A.indptr, A.indices
+    I = np.repeat(np.arange(indptr.size - 1), np.diff(indptr))
+    J = indices[indptr[0] : indptr[-1]]
+    return np.vstack((I, J)).T.astype(np.int)
+
+
+def face_cells_map(cell_faces, num_faces):
+    # for each face the (at most two) cells that share it, in increasing order and
+    # -1 if missing, from the cell faces in I, J format sorted by cell
+    order = np.argsort(cell_faces[:, 1], kind="stable")
+    cells, faces = cell_faces[order, 0], cell_faces[order, 1]
+
+    # position of each cell among the ones of the same face
+    count = np.bincount(faces, minlength=num_faces)
+    rank = np.arange(faces.size) - (np.cumsum(count) - count)[faces]
+
+    face_cells = -np.ones((num_faces, 2), dtype=np.int)
+    face_cells[faces, rank] = cells
+    return face_cells
+
+
+def cell_cells_map(cell_connection, num_cells):
+    # for each cell the sorted neighboring cells, -1 for the missing ones
+    # NOTE: I'm assuming a simplicial grid
+    cells, neighs = compressed_to_ij(cell_connection).T
+
+    # do not save the current cell
+    mask = cells != neighs
+    cells, neighs = cells[mask], neighs[mask]
+    order = np.lexsort((neighs, cells))
+    cells, neighs = cells[order], neighs[order]
+
+    count = np.bincount(cells, minlength=num_cells)
+    rank = np.arange(cells.size) - (np.cumsum(count) - count)[cells]
+
+    # in case of boundary cell put -1 as flag
+    cell_cell_map = -np.ones((num_cells, 3), dtype=np.int)
+    cell_cell_map[cells, rank] = neighs
+    return cell_cell_map
+
+
+def fracture_arrays(g, bc, P0):
+    # the arrays to export for a 2d grid, each with the format of the text mode,
+    # generated one at a time so they can be saved and released
+
+    # extract the cell faces and the face nodes in I, J format
+    cell_faces = compressed_to_ij(g.cell_faces)
+    yield "cell_faces", cell_faces, "%d"
+    yield "face_cells", face_cells_map(cell_faces, g.num_faces), "%d"
+    del cell_faces
+    yield "face_nodes", compressed_to_ij(g.face_nodes), "%d"
+
+    # the points
+    yield "nodes", g.nodes.T, "%10.14f"
+
+    # the cell neighbors
+    yield "cell_cells", cell_cells_map(g.cell_connection_map(), g.num_cells), "%d"
+
+    # the cell centroids and volume
+    yield "cell_data", np.vstack((g.cell_volumes, g.cell_centers)).T, "%10.14f"
+
+    # the bc type
+    bc_tag = bc.is_dir.astype(np.int) + 2 * bc.is_neu.astype(np.int)
+    bc_flow_id = g.tags.get("bc_flow_id", np.zeros(g.num_faces))
+    yield "face_data", np.vstack((bc_tag, bc_flow_id)).T.astype(np.int), "%d"
+
+    # the flux
+    if P0 is not None:
+        yield "P0_flux", P0.T, "%10.14f"
+
+
+def export_fracture(folder, g, bc, P0, frac_num, binary):
+    # export a 2d grid, each array is saved as soon as it is computed
+    prefix = "g_" + str(frac_num)
+    header = {
+        "frac_num": frac_num,
+        "num_cells": int(g.num_cells),
+        "num_faces": int(g.num_faces),
+        "num_nodes": int(g.num_nodes),
+        "arrays": {},
+    }
+    for name, array, fmt in fracture_arrays(g, bc, P0):
+        fname = save_array(folder, prefix + "_" + name, array, fmt, binary)
+        header["arrays"][name] = {
+            "file": fname,
+            "dtype": array.dtype.str,
+            "shape": array.shape,
+        }
+
+    if binary:
+        with open(folder + prefix + ".json", "w") as f:
+            json.dump(header, f, indent=2)
+    return frac_num
+
+
+def trace_arrays(gb, g):
+    # the faces of the fractures that share each cell of a 1d grid, for any number
+    # of fractures, in a ragged format: the entries of the cell c are in the range
+    # indptr[c]:indptr[c+1] of frac and face, sorted by fracture. For a trace of two
+    # fractures also the dense format with the two faces of each fracture is given
+    cells, frac, face = [], [], []
+    for e, d_e in gb.edges_of_node(g):
+        g_h = gb.nodes_of_edge(e)[1]
+        face_cells = d_e["face_cells"].tocsr()
+
+        cell_faces = compressed_to_ij(face_cells)
+        cells.append(cell_faces[:, 0])
+        face.append(cell_faces[:, 1])
+        frac_id = gb.node_props(g_h, "frac_num")[0]
+        frac.append(np.full(cell_faces.shape[0], frac_id, dtype=np.int))
+
+    cells, frac, face = np.hstack(cells), np.hstack(frac), np.hstack(face)
+
+    # sort by cell and fracture, keep the order of the faces of each fracture
+    order = np.lexsort((np.arange(cells.size), frac, cells))
+    cells, frac, face = cells[order], frac[order], face[order]
+    count = np.bincount(cells, minlength=g.num_cells)
+    indptr = np.hstack(([0], np.cumsum(count))).astype(np.int)
+
+    arrays = {}
+    arrays["indptr"] = (indptr, "%d")
+    arrays["frac"] = (frac, "%d")
+    arrays["face"] = (face, "%d")
+
+    frac_num = np.unique(frac)
+    if frac_num.size == 2 and np.all(count == 4):
+        arrays["faces"] = (face.reshape((g.num_cells, 4)), "%d")
+
+    return frac_num, arrays
+
+
+def save_array(folder, name, array, fmt, binary):
+    # save an array as text or as a binary .npy file, return the file name
+    if binary:
+        fname = name + ".npy"
+        np.save(folder + fname, np.ascontiguousarray(array))
+    else:
+        fname = name + ".txt"
+        np.savetxt(folder + fname, array, fmt=fmt, delimiter=",")
+    return fname
+
+
+def grid_export(gb, P0_flux, folder, binary=False, num_workers=1, max_in_flight=None):
+    # export the grids as text files or, if binary is True, as .npy files with a
+    # json header for each fracture, see load_fracture. With more than one worker
+    # the fractures are exported in parallel by a pool of processes, at most
+    # max_in_flight (twice the workers by default) are submitted at the same time
+    # to bound the memory
 
     if not os.path.exists(folder):
         os.makedirs(folder)
 
-    # export the grids
-    for g, d in gb:
+    # the data needed to export each 2d grid
+    def fractures():
+        for g, d in gb:
+            # only 2d fractures
+            if g.dim != 2:
+                continue
 
-        # only 2d fractures
-        if g.dim != 2:
-            continue
+            bc = d[pp.PARAMETERS]["flow_data"]["bc"]
+            P0 = d[P0_flux] if P0_flux is not None else None
+            # extract the id of the fracture
+            frac_num = int(d["frac_num"][0])
+            yield folder, g, bc, P0, frac_num, binary
 
-        # extract the id of the fracture
-        frac_num = int(d["frac_num"][0])
-
-        # extract the cell faces in I, J format
-        cell_faces_I = []
-        cell_faces_J = []
-        # loop on all the cells and get the faces (from the indices map)
-        indices = g.cell_faces.indices
-        indptr = g.cell_faces.indptr
-        face_cells = -np.ones((g.num_faces, 2), dtype=np.int)
-        for cell in np.arange(g.num_cells):
-            faces = indices[indptr[cell] : indptr[cell + 1]]
-            cell_faces_I.append([cell] * faces.size)
-            cell_faces_J.append(faces.tolist())
-            for face in faces:
-                idx = np.where(face_cells[face, :] == -1)[0]
-                face_cells[face, idx[0]] = cell
-
-        # convert to numpy array
-        cell_faces_I = np.hstack(cell_faces_I).astype(np.int)
-        cell_faces_J = np.hstack(cell_faces_J).astype(np.int)
-
-        # save to file the map
-        fname = "g_" + str(frac_num) + "_cell_faces.txt"
-        cell_faces = np.vstack((cell_faces_I, cell_faces_J)).T
-        np.savetxt(folder + fname, cell_faces, fmt="%d", delimiter=",")
-
-        # save to file the map
-        fname = "g_" + str(frac_num) + "_face_cells.txt"
-        np.savetxt(folder + fname, face_cells, fmt="%d", delimiter=",")
-
-        # extract the face nodes in I, J format
-        face_nodes_I = []
-        face_nodes_J = []
-        # loop on all the faces and get the nodes (from the indices map)
-        indices = g.face_nodes.indices
-        indptr = g.face_nodes.indptr
-        for face in np.arange(g.num_faces):
-            nodes = indices[indptr[face] : indptr[face + 1]]
-            face_nodes_I.append([face] * nodes.size)
-            face_nodes_J.append(nodes.tolist())
-
-        # convert to numpy array
-        face_nodes_I = np.hstack(face_nodes_I)
-        face_nodes_J = np.hstack(face_nodes_J)
-
-        # save to file the map
-        fname = "g_" + str(frac_num) + "_face_nodes.txt"
-        face_nodes = np.vstack((face_nodes_I, face_nodes_J)).T
-        np.savetxt(folder + fname, face_nodes, fmt="%d", delimiter=",")
-
-        # save to file the points
-        fname = "g_" + str(frac_num) + "_nodes.txt"
-        np.savetxt(folder + fname, g.nodes.T, fmt="%10.14f", delimiter=",")
-
-        # save the cell neighbors
-        cell_cell_map = np.zeros((g.num_cells, 3))
-        cell_connection = g.cell_connection_map()
-        indices = cell_connection.indices
-        indptr = cell_connection.indptr
-        # NOTE: I'm assuming a simplicial grid
-        for cell in np.arange(g.num_cells):
-            cells = np.sort(indices[indptr[cell] : indptr[cell + 1]])
-            # do not save the current cell
-            cells = np.setdiff1d(cells, cell, assume_unique=True)
-            # in case of boundary cell put -1 as flag
-            if cells.size < 3:
-                cells = np.append(cells, [-1] * (3 - cells.size))
-            cell_cell_map[cell, :] = cells.copy()
-
-        fname = "g_" + str(frac_num) + "_cell_cells.txt"
-        np.savetxt(folder + fname, cell_cell_map, fmt="%d", delimiter=",")
-
-        # save to file the cell centroids and volume
-        fname = "g_" + str(frac_num) + "_cell_data.txt"
-        cell_data = np.vstack((g.cell_volumes, g.cell_centers)).T
-        np.savetxt(folder + fname, cell_data, fmt="%10.14f", delimiter=",")
-
-        # save to file the bc type
-        fname = "g_" + str(frac_num) + "_face_data.txt"
-        bc = d[pp.PARAMETERS]["flow_data"]["bc"]
-        bc_tag = bc.is_dir.astype(np.int) + 2 * bc.is_neu.astype(np.int)
-        bc_tags = np.vstack((bc_tag, g.tags["bc_flow_id"])).T
-        np.savetxt(folder + fname, bc_tags, fmt="%d", delimiter=",")
+    # export the grids
+    if num_workers <= 1:
+        for args in fractures():
+            export_fracture(*args)
+    else:
+        if max_in_flight is None:
+            max_in_flight = 2 * num_workers
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=context
+        ) as executor:
+            pending = set()
+            for args in fractures():
+                if len(pending) >= max_in_flight:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(export_fracture, *args))
+            for future in concurrent.futures.as_completed(pending):
+                future.result()
 
     # export the connectivity maps
     for g, d in gb:
@@ -107,49 +205,45 @@ def grid_export(gb, P0_flux, folder):
         if g.dim != 1:
             continue
 
-        # we assume only two intersecting fractures
-        faces = np.empty((g.num_cells, 4), dtype=np.int)
-        frac_num = np.empty(2, dtype=np.int)
-
-        frac_id = 0
-        for e, d_e in gb.edges_of_node(g):
-            g_h = gb.nodes_of_edge(e)[1]
-            frac_num[frac_id] = gb.node_props(g_h, "frac_num")[0]
-
-            face_cells = d_e["face_cells"].astype(np.int).tocsr()
-            # loop on all the cells and get the faces (from the indices map)
-            for cell in np.arange(g.num_cells):
-                indices = face_cells.indices
-                indptr = face_cells.indptr
-                faces[cell, (2 * frac_id) : (2 * frac_id + 2)] = indices[
-                    indptr[cell] : indptr[cell + 1]
-                ]
-
-            frac_id += 1
-
-        faces_sorted = np.empty((g.num_cells, 4), dtype=np.int)
-        sort = np.argsort(frac_num)
-        for idx, idx_sorted in enumerate(sort):
-            faces_sorted[:, (2 * idx) : (2 * idx + 2)] = faces[
-                :, (2 * idx_sorted) : (2 * idx_sorted + 2)
-            ]
-
-        # save to file
-        trace_id = "_".join([str(f) for f in frac_num[sort]])
-        fname = "t_" + trace_id + "_faces.txt"
-        np.savetxt(folder + fname, faces_sorted, fmt="%d", delimiter=",")
-
-    # export the flux
-    if P0_flux is not None:
-        for g, d in gb:
-
-            # only 2d grid
-            if g.dim != 2:
-                continue
-
-            # extract the id of the fracture
-            frac_num = int(d["frac_num"][0])
-
-            # save to file the points
-            fname = "g_" + str(frac_num) + "_P0_flux.txt"
-            np.savetxt(folder + fname, d[P0_flux].T, fmt="%10.14f", delimiter=",")
+        frac_num, arrays = trace_arrays(gb, g)
+        trace_id = "t_" + "_".join([str(f) for f in frac_num])
+        for name, (array, fmt) in arrays.items():
+            save_array(folder, trace_id + "_" + name, array, fmt, binary)
+
+
+def load_fracture(folder, frac_num, mmap_mode="r"):
+    # load the arrays of a fracture exported in binary mode, by default memory
+    # mapped so nothing is read until accessed
+    with open(os.path.join(folder, "g_" + str(frac_num) + ".json")) as f:
+        header = json.load(f)
+
+    arrays = {}
+    for name, info in header["arrays"].items():
+        fname = os.path.join(folder, info["file"])
+        arrays[name] = np.load(fname, mmap_mode=mmap_mode)
+    return header, arrays
+
+
+def load_grid_export(folder, mmap_mode="r"):
+    # load all the fractures exported in binary mode, indexed by fracture id
+    fractures = {}
+    for fname in sorted(glob.glob(os.path.join(folder, "g_*.json"))):
+        frac_num = int(os.path.basename(fname)[2:-5])
+        fractures[frac_num] = load_fracture(folder, frac_num, mmap_mode)
+    return fractures
+
+
+def load_trace(folder, trace_id, mmap_mode="r"):
+    # load the ragged connectivity of a trace, e.g. trace_id = "t_1_4_7", and return
+    # for each cell the list of (fracture id, face) pairs
+    arrays = {}
+    for name in ["indptr", "frac", "face"]:
+        fname = os.path.join(folder, trace_id + "_" + name)
+        if os.path.exists(fname + ".npy"):
+            arrays[name] = np.load(fname + ".npy", mmap_mode=mmap_mode)
+        else:
+            arrays[name] = np.loadtxt(fname + ".txt", dtype=np.int, ndmin=1)
+
+    indptr = arrays["indptr"]
+    pairs = np.vstack((arrays["frac"], arrays["face"])).T
+    return [pairs[indptr[c] : indptr[c + 1]] for c in np.arange(indptr.size - 1)]
@@ -0,0 +1,155 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# ------------------------------------------------------------------------------#
+
+
+def rss():
+    # resident set size of the process in bytes
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # peak resident size, in kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+# ------------------------------------------------------------------------------#
+
+
+class MemoryTracer(object):
+    # attribute the memory to the stages of a simulation: the python allocations are
+    # traced with tracemalloc and the resident set size is sampled by a thread, the
+    # stages can be nested and repeated
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.active = False
+        self.stack = []
+        self.stages = {}
+        self.order = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        tracemalloc.start()
+        self.sampler = threading.Thread(target=self._sample)
+        self.sampler.daemon = True
+        self.sampler.start()
+
+    def stop(self):
+        self.active = False
+        tracemalloc.stop()
+
+    def reset(self, keep=()):
+        # forget the stages recorded so far, except the ones in keep, so that a
+        # report covers a single simulation and not the whole process
+        with self.lock:
+            self.order = [name for name in self.order if name in keep]
+            self.stages = {name: self.stages[name] for name in self.order}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.active:
+            yield
+            return
+
+        self._update_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        entry = {"name": name, "start": current, "peak": current, "rss_start": rss()}
+        entry["rss_peak"] = entry["rss_start"]
+        with self.lock:
+            self.stack.append(entry)
+        try:
+            yield
+        finally:
+            self._update_peak()
+            with self.lock:
+                self.stack.pop()
+            self._record(entry, tracemalloc.get_traced_memory()[0], rss())
+
+    def _update_peak(self):
+        # move the peak since the last reset to all the active stages
+        peak = tracemalloc.get_traced_memory()[1]
+        with self.lock:
+            for entry in self.stack:
+                entry["peak"] = max(entry["peak"], peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    def _record(self, entry, end, rss_end):
+        name = entry["name"]
+        if name not in self.stages:
+            self.order.append(name)
+            self.stages[name] = {
+                "count": 0,
+                "python_net": 0,
+                "python_peak": 0,
+                "python_peak_increase": 0,
+                "rss_net": 0,
+                "rss_peak": 0,
+            }
+        stage = self.stages[name]
+        stage["count"] += 1
+        stage["python_net"] += end - entry["start"]
+        stage["python_peak"] = max(stage["python_peak"], entry["peak"])
+        increase = entry["peak"] - entry["start"]
+        stage["python_peak_increase"] = max(stage["python_peak_increase"], increase)
+        stage["rss_net"] += rss_end - entry["rss_start"]
+        stage["rss_peak"] = max(stage["rss_peak"], entry["rss_peak"], rss_end)
+
+    def _sample(self):
+        while self.active:
+            value = rss()
+            with self.lock:
+                for entry in self.stack:
+                    entry["rss_peak"] = max(entry["rss_peak"], value)
+            time.sleep(self.interval)
+
+    def report(self):
+        return {
+            "unit": "bytes",
+            "rss": rss(),
+            "stages": [dict(self.stages[name], name=name) for name in self.order],
+        }
+
+    def write(self, file_name):
+        with open(file_name, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+# ------------------------------------------------------------------------------#
+
+# tracer shared by the whole simulation, enabled by the environment variable; the
+# meshing is traced only in this way since param["memory_trace"] starts the tracer
+# in flow and advdiff, after the grid bucket is created
+tracer = MemoryTracer()
+if os.environ.get("DFN_MEMORY_TRACE", "0") not in ["", "0"]:
+    tracer.start()
+
+
+def stage(name):
+    return tracer.stage(name)
+
+
+def write(file_name):
+    # write the report only if the tracer is active
+    if tracer.active:
+        tracer.write(file_name)
+
+
+# ------------------------------------------------------------------------------#
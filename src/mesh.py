@@ -0,0 +1,152 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import pickle
+import scipy.sparse as sps
+import porepy as pp
+
+import memory
+
+logger = logging.getLogger(__name__)
+
+# bump when the content of the cached grid buckets changes
+CACHE_VERSION = 1
+
+# ------------------------------------------------------------------------------#
+
+
+def cache_key(file_name, mesh_kwargs, tol):
+    # hash of everything the grid bucket depends on
+    key = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        key.update(f.read())
+
+    info = {
+        "tol": repr(tol),
+        "mesh_kwargs": {k: repr(v) for k, v in mesh_kwargs.items()},
+        "porepy": getattr(pp, "__version__", ""),
+        "version": CACHE_VERSION,
+    }
+    key.update(json.dumps(info, sort_keys=True).encode())
+    return key.hexdigest()
+
+
+# ------------------------------------------------------------------------------#
+
+
+def create_gb(file_name, mesh_kwargs, tol, cache=None):
+    # import the network, mesh it and compute the geometry; if a cache folder is
+    # given the grid bucket is loaded from there or stored for the next time
+    # the memory report starts with the new grid bucket
+    memory.tracer.reset()
+    if cache is not None:
+        file_cache = os.path.join(cache, cache_key(file_name, mesh_kwargs, tol) + ".pkl")
+        if os.path.exists(file_cache):
+            logger.info("Load the grid bucket from " + file_cache)
+            with memory.stage("meshing"), open(file_cache, "rb") as f:
+                gb = pickle.load(f)
+            logger.info("done")
+            return gb
+
+    logger.info("Create the grid bucket for " + file_name)
+    with memory.stage("meshing"):
+        network = pp.fracture_importer.network_3d_from_fab(file_name, tol=tol)
+        gb = network.mesh(mesh_kwargs, dfn=True)
+
+        gb.remove_nodes(lambda g: g.dim == 0)
+        gb.compute_geometry()
+        gb.assign_node_ordering()
+    logger.info("done")
+
+    if cache is not None:
+        logger.info("Save the grid bucket in " + file_cache)
+        if not os.path.exists(cache):
+            os.makedirs(cache)
+        # write on a temporary file first so that concurrent runs do not read a
+        # partially written cache
+        file_tmp = file_cache + "." + str(os.getpid()) + ".tmp"
+        with open(file_tmp, "wb") as f:
+            pickle.dump(gb, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file_tmp, file_cache)
+        logger.info("done")
+
+    return gb
+
+
+# ------------------------------------------------------------------------------#
+
+
+def freeze(g):
+    # make the geometry of the grid read-only, so that it can be safely shared
+    fields = ["nodes", "face_centers", "face_normals", "face_areas"]
+    fields += ["cell_centers", "cell_volumes"]
+    for field in fields:
+        value = getattr(g, field, None)
+        if value is not None:
+            value.flags.writeable = False
+    return g
+
+
+# ------------------------------------------------------------------------------#
+
+
+def copy_data(d):
+    # copy the dictionary and its sub-dictionaries (state, parameters, etc.) but
+    # not the arrays they contain, values are replaced and never modified in place
+    return {k: copy.copy(v) if isinstance(v, dict) else v for k, v in d.items()}
+
+
+# ------------------------------------------------------------------------------#
+
+
+def copy_mortar_grid(mg):
+    # copy of the mortar grid with its own projection matrices, the side grids are
+    # shared
+    mg_copy = copy.copy(mg)
+    for key, value in vars(mg).items():
+        if sps.issparse(value):
+            setattr(mg_copy, key, value.copy())
+        elif isinstance(value, dict):
+            setattr(mg_copy, key, dict(value))
+    return mg_copy
+
+
+# ------------------------------------------------------------------------------#
+
+
+def copy_gb(gb):
+    # lightweight copy of the grid bucket: the grids and mortar grids are new
+    # objects that share the (read-only) geometry arrays of the original, while
+    # tags, data dictionaries and the connectivity, which the coarsening changes,
+    # are independent
+    grid_map = {}
+    for g, _ in gb:
+        g_copy = copy.copy(freeze(g))
+        g_copy.tags = dict(g.tags)
+        g_copy.cell_faces = g.cell_faces.copy()
+        g_copy.face_nodes = g.face_nodes.copy()
+        grid_map[g] = g_copy
+
+    gb_copy = pp.GridBucket()
+    gb_copy.add_nodes(list(grid_map.values()))
+    for g, d in gb:
+        for key, value in copy_data(d).items():
+            gb_copy.set_node_prop(grid_map[g], key, value)
+
+    for e, d in gb.edges():
+        e_copy = [grid_map[g] for g in e]
+        gb_copy.add_edge(e_copy, d["face_cells"].copy())
+
+        d_copy = copy_data(d)
+        d_copy.pop("face_cells", None)
+        if "mortar_grid" in d_copy:
+            d_copy["mortar_grid"] = copy_mortar_grid(d["mortar_grid"])
+        for key, value in d_copy.items():
+            gb_copy.set_edge_prop(e_copy, key, value)
+
+    return gb_copy
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,117 @@
+import collections
+import contextlib
+import fnmatch
+import os
+import sys
+import threading
+import time
+
+# ------------------------------------------------------------------------------#
+
+
+class SamplingProfiler(object):
+    # statistical profiler of selected phases: a thread samples at a fixed interval
+    # the stack of the thread running the phase and counts the collapsed stacks,
+    # written in the folded format read by the flame graph tools
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.patterns = []
+        self.current = None
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+        self.sampler = None
+
+    def configure(self, phases):
+        # phases is "all", a comma separated string or a list of patterns, a pattern
+        # like "flow" selects all the phases "flow.*"
+        if phases is None:
+            phases = []
+        elif isinstance(phases, str):
+            phases = [p.strip() for p in phases.split(",")]
+        self.patterns = [p for p in phases if p not in ["", "0"]]
+
+    @property
+    def active(self):
+        return len(self.patterns) > 0
+
+    def selected(self, name):
+        for pattern in self.patterns:
+            if pattern == "all" or fnmatch.fnmatch(name, pattern):
+                return True
+            if name.startswith(pattern + "."):
+                return True
+        return False
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        # the nested phases are sampled as part of the outer one
+        if self.current is not None or not self.selected(name):
+            yield
+            return
+
+        if self.sampler is None:
+            self.sampler = threading.Thread(target=self._sample)
+            self.sampler.daemon = True
+            self.sampler.start()
+
+        with self.lock:
+            self.current = (name, threading.get_ident())
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.current = None
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                current = self.current
+            if current is None:
+                continue
+
+            frame = sys._current_frames().get(current[1], None)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                file_name = os.path.basename(code.co_filename)
+                stack.append(code.co_name + " (" + file_name + ")")
+                frame = frame.f_back
+            stack.append(current[0])
+
+            with self.lock:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, file_name):
+        # write the folded stacks collected so far and start a new collection
+        with self.lock:
+            counts, self.counts = self.counts, collections.Counter()
+        with open(file_name, "w") as f:
+            for stack, count in sorted(counts.items()):
+                f.write(stack + " " + str(count) + "\n")
+
+
+# ------------------------------------------------------------------------------#
+
+# profiler shared by the whole simulation, the phases are selected by the
+# environment variable (e.g. DFN_PROFILE=flow.solve,transport or DFN_PROFILE=all)
+sampler = SamplingProfiler()
+sampler.configure(os.environ.get("DFN_PROFILE", None))
+
+
+def configure(phases):
+    sampler.configure(phases)
+
+
+def phase(name):
+    return sampler.phase(name)
+
+
+def write(file_name):
+    # write the profile only if some phase is selected
+    if sampler.active:
+        sampler.write(file_name)
+
+
+# ------------------------------------------------------------------------------#
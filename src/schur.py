@@ -0,0 +1,195 @@
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+import numpy as np
+import scipy.linalg as la
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+
+import solver
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------#
+
+
+def local_problem(A, dof, interface, param):
+    # factorize the local problem of a fracture and compute its contribution
+    # A_tg K_g^-1 A_gt to the Schur complement, only for the interface dof coupled
+    # with the fracture
+    factor = solver.factorize(A[dof][:, dof], param)
+    A_gt = A[dof][:, interface].tocsc()
+    A_tg = A[interface][:, dof].tocsr()
+
+    rows = np.flatnonzero(np.diff(A_tg.indptr))
+    cols = np.flatnonzero(np.diff(A_gt.indptr))
+    num_interface = interface.size
+    if rows.size == 0 or cols.size == 0:
+        return factor, A_gt.tocsr(), A_tg, sps.csr_matrix((num_interface,) * 2)
+
+    # the columns are solved in blocks to bound the dense memory of each thread
+    block_size = param.get("schur_block_size", 256)
+    A_tg_rows = A_tg[rows]
+    data, I, J = [], [], []
+    for start in np.arange(0, cols.size, block_size):
+        block = cols[start : start + block_size]
+        Z = factor.solve(A_gt[:, block].toarray())
+        data.append(A_tg_rows.dot(Z).ravel())
+        I_b, J_b = np.meshgrid(rows, block, indexing="ij")
+        I.append(I_b.ravel())
+        J.append(J_b.ravel())
+
+    data, I, J = np.hstack(data), np.hstack(I), np.hstack(J)
+    C = sps.csr_matrix((data, (I, J)), shape=(num_interface,) * 2)
+    return factor, A_gt.tocsr(), A_tg, C
+
+
+
+# ------------------------------------------------------------------------------#
+
+
+class SPDSolver(object):
+    # solver of an interface system which is expected symmetric definite: the sign
+    # is normalized to have a positive diagonal, then the system is solved with
+    # CHOLMOD if available, with a dense Cholesky if small or with the conjugate
+    # gradient preconditioned by Jacobi. LU is used if the system is not symmetric
+    # positive definite
+
+    def __init__(self, S, param):
+        S = S.tocsc()
+        diag = S.diagonal()
+        self.sign = -1.0 if np.sum(diag) < 0 else 1.0
+        self.S = self.sign * S
+        self.param = param
+        diag = self.sign * diag
+
+        scale = abs(self.S).max()
+        asym = abs(self.S - self.S.T).max() if scale > 0 else 0
+        if asym > param.get("symmetry_tol", 1e-10) * scale or np.any(diag <= 0):
+            self._lu("Interface system not symmetric positive, use LU")
+        elif solver.cholmod is not None:
+            try:
+                self.method = "cholmod"
+                lu_param = dict(param, direct_solver="cholmod")
+                self.factor = solver.factorize(self.S, lu_param)
+            except solver.cholmod.CholmodError:
+                self._lu("CHOLMOD failed on the interface system, use LU")
+        elif self.S.shape[0] <= param.get("dense_size", 2000):
+            try:
+                self.method = "dense"
+                self.factor = la.cho_factor(self.S.toarray())
+            except la.LinAlgError:
+                self._lu("Interface system not positive definite, use LU")
+        else:
+            self.method = "cg"
+            self.M = sps.diags(1.0 / diag)
+
+    def _lu(self, msg):
+        logger.warning(msg)
+        self.method = "lu"
+        self.factor = solver.factorize(self.S, self.param)
+
+    def solve(self, r):
+        r = self.sign * r
+        if self.method == "dense":
+            return la.cho_solve(self.factor, r)
+        elif self.method != "cg":
+            return self.factor.solve(r)
+
+        num_iter = [0]
+
+        def callback(_):
+            num_iter[0] += 1
+
+        tol = self.param.get("solver_tol", 1e-10)
+        maxiter = self.param.get("solver_maxiter", 1000)
+        x, info = spla.cg(
+            self.S, r, tol=tol, maxiter=maxiter, M=self.M, callback=callback
+        )
+        msg = "cg on the interface system: " + str(num_iter[0]) + " iterations"
+        if info == 0:
+            logger.info(msg)
+        else:
+            logger.warning(msg + " (not converged, info " + str(info) + ")")
+        return x
+
+
+# ------------------------------------------------------------------------------#
+
+
+class SchurComplement(object):
+    # elimination of the fracture blocks: each fracture, with the mortar variables of
+    # the edges where it is the master, is a local problem factorized independently
+    # and in parallel, the remaining system S = A_tt - sum_g A_tg K_g^-1 A_gt is on
+    # the dof of the traces (1d grids)
+
+    def __init__(self, A, assembler, param):
+        A = A.tocsr()
+        self.local, self.interface = solver.dof_partition(assembler, with_mortar=True)
+        self.shape = A.shape
+
+        self.param = solver.local_param(param)
+
+        num_threads = param.get("schur_threads", None) or os.cpu_count()
+        self.pool = ThreadPool(num_threads)
+
+        t = self.interface
+        args = [(A, dof, t, self.param) for dof in self.local]
+        local = self.pool.starmap(local_problem, args)
+        self.factors = [l[0] for l in local]
+        self.A_gt = [l[1] for l in local]
+        self.A_tg = [l[2] for l in local]
+
+        if t.size:
+            S = A[t][:, t] - sum([l[3] for l in local])
+            self.S = S.tocsc()
+            # the hybrid formulation expects a symmetric definite interface system
+            if param.get("solver", None) == "hybrid":
+                self.factor_S = SPDSolver(self.S, self.param)
+            else:
+                self.factor_S = solver.factorize(self.S, self.param)
+
+        msg = "Schur complement with " + str(len(self.local)) + " local problems, "
+        msg += "interface of " + str(t.size) + " dof"
+        if t.size:
+            msg += " and " + str(self.S.nnz) + " non-zeros"
+            if isinstance(self.factor_S, SPDSolver):
+                msg += ", solved with " + self.factor_S.method
+        logger.info(msg)
+
+    def solve(self, b):
+        t = self.interface
+        x = np.zeros(self.shape[0], dtype=b.dtype)
+
+        if t.size:
+            # eliminate the local problems from the right-hand side
+            args = [(f, b[dof]) for f, dof in zip(self.factors, self.local)]
+            y = self.pool.starmap(solver.local_solve, args)
+            r = b[t] - sum([A_tg.dot(y_g) for A_tg, y_g in zip(self.A_tg, y)])
+            x[t] = self.factor_S.solve(r)
+
+        # back-substitution of the interface values in the local problems
+        local = zip(self.factors, self.local, self.A_gt)
+        args = [(f, b[dof] - A_gt.dot(x[t])) for f, dof, A_gt in local]
+        x_local = self.pool.starmap(solver.local_solve, args)
+        for dof, x_g in zip(self.local, x_local):
+            x[dof] = x_g
+        return x
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+# ------------------------------------------------------------------------------#
+
+
+def solve(A, b, assembler, param):
+    schur = SchurComplement(A, assembler, param)
+    try:
+        return schur.solve(b)
+    finally:
+        schur.close()
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,104 @@
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+
+import solver
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------#
+
+
+def subdomains(A, assembler):
+    # each subdomain is a fracture with the mortar variables of the edges where it is
+    # the master, which it owns, and overlaps with the dof of the 1d grids coupled to
+    # them. Each 1d dof is owned by the first subdomain that contains it
+    A = A.tocsr()
+    A_t = A.T.tocsr()
+    local, interface = solver.dof_partition(assembler, with_mortar=True)
+
+    owner = np.full(A.shape[0], -1, dtype=int)
+    for i, dof in enumerate(local):
+        owner[dof] = i
+    is_interface = np.zeros(A.shape[0], dtype=bool)
+    is_interface[interface] = True
+
+    domains = []
+    for i, dof in enumerate(local):
+        coupled = np.union1d(A[dof].indices, A_t[dof].indices)
+        overlap = coupled[is_interface[coupled]]
+        owner[overlap[owner[overlap] < 0]] = i
+        domains.append(np.hstack((dof, overlap)))
+
+    # dof not coupled with any fracture form their own subdomain
+    left = np.flatnonzero(owner < 0)
+    if left.size:
+        owner[left] = len(domains)
+        domains.append(left)
+
+    return domains, owner
+
+
+# ------------------------------------------------------------------------------#
+
+
+def local_factor(A, dof, shift, param):
+    # factorize the matrix of a subdomain, the rows of the 1d grids in the flow are
+    # a constraint with zero diagonal which is shifted to regularize the problem
+    A_loc = A[dof][:, dof].tocsr()
+    zero = A_loc.diagonal() == 0
+    if shift > 0 and np.any(zero):
+        A_loc = A_loc + sps.diags(shift * abs(A_loc).max() * zero)
+    return solver.factorize(A_loc, param)
+
+
+
+# ------------------------------------------------------------------------------#
+
+
+class Schwarz(spla.LinearOperator):
+    # restricted additive Schwarz preconditioner with one subdomain per fracture,
+    # the local problems are factorized and solved in a thread pool, which is kept
+    # along the iterations and the time steps until close is called
+
+    def __init__(self, A, assembler, param):
+        A = A.tocsr()
+        super(Schwarz, self).__init__(A.dtype, A.shape)
+
+        self.domains, owner = subdomains(A, assembler)
+        self.owned = [owner[dof] == i for i, dof in enumerate(self.domains)]
+
+        local_param = solver.local_param(param)
+
+        shift = param.get("schwarz_shift", 1e-8)
+        num_threads = param.get("schwarz_threads", None) or os.cpu_count()
+        self.pool = ThreadPool(num_threads)
+        args = [(A, dof, shift, local_param) for dof in self.domains]
+        self.factors = self.pool.starmap(local_factor, args)
+
+        size = [dof.size for dof in self.domains]
+        logger.info(
+            "Schwarz preconditioner with " + str(len(self.domains)) + " subdomains, "
+            + "from " + str(np.amin(size)) + " to " + str(np.amax(size)) + " dof"
+        )
+
+    def _matvec(self, r):
+        r = np.ravel(r)
+        args = [(f, r[dof]) for f, dof in zip(self.factors, self.domains)]
+        z = self.pool.starmap(solver.local_solve, args)
+
+        # each dof takes the value of the subdomain that owns it
+        y = np.zeros(r.shape, dtype=np.result_type(self.dtype, r.dtype))
+        for dof, owned, z_i in zip(self.domains, self.owned, z):
+            y[dof[owned]] = z_i[owned]
+        return y
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+# ------------------------------------------------------------------------------#
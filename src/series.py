@@ -0,0 +1,159 @@
+import logging
+import os
+import numpy as np
+import scipy.sparse as sps
+import porepy as pp
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------#
+
+
+def cell_nodes(g):
+    # nodes of each cell and their number, for a 2d grid the nodes are in the order
+    # of the boundary of the polygon, obtained by chaining the faces oriented with
+    # the sign of cell_faces
+    if g.dim != 2:
+        cn = g.cell_nodes().tocsc()
+        return np.diff(cn.indptr), cn.indices
+
+    faces, cells, sign = sps.find(g.cell_faces)
+    order = np.argsort(cells, kind="stable")
+    faces, cells, sign = faces[order], cells[order], sign[order]
+
+    # the two nodes of each face, as start and end of the oriented edge
+    face_nodes = g.face_nodes.tocsc()
+    n0 = face_nodes.indices[face_nodes.indptr[faces]]
+    n1 = face_nodes.indices[face_nodes.indptr[faces] + 1]
+    start = np.where(sign > 0, n0, n1)
+    end = np.where(sign > 0, n1, n0)
+
+    # the next edge of each edge is the one of the same cell that starts at its end
+    offset = cells.astype(np.int64) * g.num_nodes
+    key = offset + start
+    by_key = np.argsort(key)
+    succ = by_key[np.searchsorted(key[by_key], offset + end)]
+
+    count = np.bincount(cells, minlength=g.num_cells)
+    first = np.cumsum(count) - count
+
+    indices = np.empty(cells.size, dtype=int)
+    current = first.copy()
+    for k in np.arange(np.amax(count) if count.size else 0):
+        active = np.flatnonzero(count > k)
+        indices[first[active] + k] = start[current[active]]
+        current[active] = succ[current[active]]
+
+    return count, indices
+
+
+# ------------------------------------------------------------------------------#
+
+
+class SeriesWriter(object):
+    # time series of the variables on the 2d grids: the mesh and the constant
+    # variables are stored once in file_name_mesh.npz, each time dependent variable
+    # in a file_name_<variable>.npy array (one row per exported step) that can be
+    # memory-mapped by the reader
+
+    def __init__(self, gb, file_name, folder, variables, dynamic, num_steps, dim=2):
+        self.prefix = os.path.join(folder, file_name)
+        self.dynamic = dynamic
+        self.steps = []
+        self.grids = [(g, d) for g, d in gb if g.dim == dim]
+
+        # geometry and connectivity, the cells of each fracture are contiguous
+        num_cells = np.array([g.num_cells for g, _ in self.grids], dtype=int)
+        num_nodes = np.array([g.num_nodes for g, _ in self.grids], dtype=int)
+        node_offset = np.r_[0, np.cumsum(num_nodes)[:-1]]
+
+        # the nodes of the cells are ordered along the boundary of each polygon
+        nodes = [cell_nodes(g) for g, _ in self.grids]
+        indices = [n[1] + o for n, o in zip(nodes, node_offset)]
+        indptr = np.cumsum(np.r_[0, np.hstack([n[0] for n in nodes])])
+
+        mesh = {
+            "nodes": np.hstack([g.nodes for g, _ in self.grids]),
+            "cell_nodes_indices": np.hstack(indices),
+            "cell_nodes_indptr": indptr,
+            "cell_centers": np.hstack([g.cell_centers for g, _ in self.grids]),
+            "grid_offset": np.r_[0, np.cumsum(num_cells)],
+            "grid_frac_num": np.array([int(d["frac_num"][0]) for _, d in self.grids]),
+        }
+
+        # constant variables, stored once
+        for var in variables:
+            if var not in dynamic:
+                mesh[var] = np.hstack([d[pp.STATE][var] for _, d in self.grids])
+
+        np.savez(self.prefix + "_mesh.npz", **mesh)
+
+        # time dependent variables, preallocated for all the exported steps
+        shape = (num_steps, mesh["grid_offset"][-1])
+        self.data = {}
+        for var in dynamic:
+            file_var = self.prefix + "_" + var + ".npy"
+            if num_steps > 0:
+                self.data[var] = np.lib.format.open_memmap(
+                    file_var, mode="w+", dtype=np.float64, shape=shape
+                )
+            else:  # an empty file cannot be memory-mapped
+                np.save(file_var, np.empty(shape))
+
+    def write(self, step):
+        row = len(self.steps)
+        for var, data in self.data.items():
+            data[row] = np.hstack([d[pp.STATE][var] for _, d in self.grids])
+        self.steps.append(step)
+
+    def close(self, time):
+        for data in self.data.values():
+            data.flush()
+        steps = np.array(self.steps, dtype=int)
+        np.savez(self.prefix + "_steps.npz", steps=steps, time=time[steps])
+
+
+# ------------------------------------------------------------------------------#
+
+
+class SeriesReader(object):
+    # read the time series written by SeriesWriter, the time dependent variables are
+    # memory-mapped so only the requested slices are loaded
+
+    def __init__(self, folder, file_name="solution"):
+        self.prefix = os.path.join(folder, file_name)
+        self.mesh = np.load(self.prefix + "_mesh.npz")
+
+        steps = np.load(self.prefix + "_steps.npz")
+        self.steps = steps["steps"]
+        self.time = steps["time"]
+
+        offset = self.mesh["grid_offset"]
+        self.cells = {
+            int(frac_num): slice(offset[i], offset[i + 1])
+            for i, frac_num in enumerate(self.mesh["grid_frac_num"])
+        }
+
+    def variable(self, var):
+        # memory-mapped array of the variable, one row per exported step
+        return np.load(self.prefix + "_" + var + ".npy", mmap_mode="r")
+
+    def constant(self, var, frac_num=None):
+        value = self.mesh[var]
+        if frac_num is None:
+            return value
+        return value[..., self.cells[frac_num]]
+
+    def step(self, var, i):
+        # values of the variable on all the cells at the i-th exported step
+        return np.array(self.variable(var)[i])
+
+    def fracture(self, var, frac_num):
+        # values of the variable on the cells of a fracture for all the steps
+        return np.array(self.variable(var)[:, self.cells[frac_num]])
+
+    def fractures(self):
+        return np.array(sorted(self.cells.keys()))
+
+
+# ------------------------------------------------------------------------------#
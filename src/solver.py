@@ -0,0 +1,413 @@
+import collections
+import hashlib
+import logging
+import threading
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+import porepy as pp
+
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+try:
+    import scikits.umfpack as umfpack
+except ImportError:
+    umfpack = None
+
+try:
+    from sksparse import cholmod
+except ImportError:
+    cholmod = None
+
+import schur
+import schwarz
+
+logger = logging.getLogger(__name__)
+
+# symbolic analyses of the direct solvers, indexed by backend and sparsity pattern
+SYMBOLIC_CACHE_SIZE = 16
+# the cache is shared by the threads of the schur and schwarz solvers
+symbolic_cache = collections.OrderedDict()
+symbolic_lock = threading.Lock()
+
+# ------------------------------------------------------------------------------#
+
+
+def block_indices(assembler):
+    # return, for each block of the assembler, its indices in the global vector
+    offset = np.cumsum(np.r_[0, assembler.full_dof]).astype(int)
+    return {
+        key: np.arange(offset[bi], offset[bi + 1])
+        for key, bi in assembler.block_dof.items()
+    }
+
+
+# ------------------------------------------------------------------------------#
+
+
+def dof_partition(assembler, with_mortar=False):
+    # split the dof between the fractures, one array for each 2d grid, and the
+    # interface, which collects the 1d grids and the mortar variables. If
+    # with_mortar is True the mortar variables are assigned to the fracture which is
+    # the master of the edge and the interface is made only by the 1d grids
+    fracture, interface = {}, []
+    indices = sorted(block_indices(assembler).items(), key=lambda item: item[1][0])
+    for (g, _), dof in indices:
+        if isinstance(g, pp.Grid) and g.dim == 2:
+            fracture.setdefault(g, []).append(dof)
+        elif isinstance(g, pp.Grid) or not with_mortar:
+            interface.append(dof)
+        else:  # This is really an edge, the master is the higher dimensional grid
+            master = g[0] if g[0].dim > g[1].dim else g[1]
+            fracture.setdefault(master, []).append(dof)
+
+    fracture = [np.hstack(dof) for dof in fracture.values()]
+    if interface:
+        interface = np.sort(np.hstack(interface))
+    else:
+        interface = np.empty(0, dtype=int)
+
+    return fracture, interface
+
+
+# ------------------------------------------------------------------------------#
+
+
+def rcm(A):
+    # reverse Cuthill-McKee ordering of the symmetrized pattern of the matrix
+    A = abs(A.tocsr())
+    return reverse_cuthill_mckee((A + A.T).tocsr(), symmetric_mode=True)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def reordering(A, assembler, param):
+    # fill-reducing permutation of the dof selected by param["reorder"]: "rcm" for
+    # the whole system, "block" groups each fracture with its mortar variables, each
+    # group ordered by RCM, and puts the 1d grids at the end as separators
+    method = param.get("reorder", None)
+    if method is None or method == "none":
+        return None
+
+    A = A.tocsr()
+    if method == "rcm":
+        return rcm(A)
+    elif method == "block":
+        fracture, interface = dof_partition(assembler, with_mortar=True)
+        groups = [dof for dof in fracture + [interface] if dof.size]
+        return np.hstack([dof[rcm(A[dof][:, dof])] for dof in groups])
+    else:
+        raise ValueError("Unknown reordering " + str(method))
+
+
+# ------------------------------------------------------------------------------#
+
+
+def pattern_hash(A):
+    # hash of the sparsity pattern of a csc matrix with sorted indices
+    h = hashlib.sha1(str(A.shape).encode())
+    h.update(np.ascontiguousarray(A.indptr).tobytes())
+    h.update(np.ascontiguousarray(A.indices).tobytes())
+    return h.hexdigest()
+
+
+# ------------------------------------------------------------------------------#
+
+
+class Factorization(object):
+    # sparse direct solver with the backend selected by param["direct_solver"]:
+    # "superlu" (default), "umfpack" (scikits.umfpack) or "cholmod" (scikit-sparse,
+    # only for symmetric positive definite matrices). The dof are permuted by
+    # param["reorder"] and the symbolic analysis is reused for the matrices with the
+    # same sparsity pattern, so only the numerical factorization is recomputed
+
+    def __init__(self, A, param, assembler=None):
+        self.backend = param.get("direct_solver", "superlu")
+        if self.backend not in ["superlu", "umfpack", "cholmod"]:
+            raise ValueError("Unknown direct solver " + str(self.backend))
+        if self.backend == "umfpack" and umfpack is None:
+            logger.warning("scikits.umfpack not available, use superlu")
+            self.backend = "superlu"
+        if self.backend == "cholmod" and cholmod is None:
+            logger.warning("scikit-sparse not available, use superlu")
+            self.backend = "superlu"
+
+        self.perm = reordering(A, assembler, param)
+        # the column ordering of SuperLU would override the reordering
+        permc_spec = "COLAMD" if self.perm is None else "NATURAL"
+        self.permc_spec = param.get("permc_spec", permc_spec)
+
+        self.key = None
+        self.refactor(A)
+
+    def refactor(self, A):
+        # numerical factorization of a matrix, the symbolic analysis is computed only
+        # for a new sparsity pattern
+        if self.perm is not None:
+            A = A.tocsr()[self.perm][:, self.perm]
+        A = A.tocsc()
+        A.sum_duplicates()
+        A.sort_indices()
+
+        key = (self.backend, self.permc_spec, pattern_hash(A))
+        with symbolic_lock:
+            symbolic = symbolic_cache.pop(key, None)
+        reuse = symbolic is not None
+
+        if self.backend == "superlu":
+            # the symbolic analysis is the column ordering, at the first factorization
+            # SuperLU applies it internally in the solve
+            if symbolic is None:
+                self.lu = spla.splu(A, permc_spec=self.permc_spec)
+                symbolic = np.argsort(self.lu.perm_c)
+                self.col = None
+            else:
+                self.lu = spla.splu(A[:, symbolic], permc_spec="NATURAL")
+                self.col = symbolic
+
+        elif self.backend == "umfpack":
+            # the symbolic object lives in the context, reused only by this instance
+            reuse = key == self.key
+            if not reuse:
+                family = "di" if A.indices.dtype == np.int32 else "dl"
+                self.umfpack = umfpack.UmfpackContext(family)
+                self.umfpack.symbolic(A)
+            self.umfpack.numeric(A)
+            self.A = A
+
+        elif self.backend == "cholmod":
+            if symbolic is None:
+                symbolic = cholmod.analyze(A)
+            self.factor = symbolic.cholesky(A)
+
+        if symbolic is not None:
+            with symbolic_lock:
+                symbolic_cache[key] = symbolic
+                while len(symbolic_cache) > SYMBOLIC_CACHE_SIZE:
+                    symbolic_cache.popitem(last=False)
+        self.key = key
+
+        msg = "Factorization with " + self.backend
+        if self.perm is not None:
+            msg += ", reordering of the dof"
+        logger.info(msg + (", symbolic analysis reused" if reuse else ""))
+
+    def solve(self, b):
+        if self.perm is not None:
+            b = b[self.perm]
+
+        if self.backend == "superlu":
+            x = self.lu.solve(b)
+            if self.col is not None:
+                y, x = x, np.empty_like(x)
+                x[self.col] = y
+        elif self.backend == "umfpack":
+            mode = umfpack.UMFPACK_A
+            if b.ndim == 1:
+                x = self.umfpack.solve(mode, self.A, b, autoTranspose=False)
+            else:
+                solve = self.umfpack.solve
+                x = [solve(mode, self.A, c, autoTranspose=False) for c in b.T]
+                x = np.column_stack(x)
+        else:
+            x = self.factor(b)
+
+        if self.perm is not None:
+            y, x = x, np.empty_like(x)
+            x[self.perm] = y
+        return x
+
+    __call__ = solve
+
+
+# ------------------------------------------------------------------------------#
+
+
+def factorize(A, param, assembler=None):
+    return Factorization(A, param, assembler)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def local_param(param):
+    # parameters of the local problems of the schur and schwarz solvers, the block
+    # reordering needs the assembler so the local problems use rcm
+    param = dict(param)
+    if param.get("reorder", None) == "block":
+        param["reorder"] = "rcm"
+    return param
+
+
+# ------------------------------------------------------------------------------#
+
+
+def local_solve(factor, b):
+    # solve with the factorization of a local problem, used by the thread pools
+    return factor.solve(b)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def fracture_solver(A_ff, param):
+    # approximate inverse of the fracture block, AMG is meaningful only when the
+    # block is an M-matrix (e.g. Tpfa), LU is used otherwise
+    if param.get("fracture_solver", "lu") == "amg":
+        if pyamg is not None:
+            ml = pyamg.smoothed_aggregation_solver(A_ff.tocsr())
+            logger.info("AMG hierarchy for the fracture block\n" + str(ml))
+            return ml.aspreconditioner(cycle="V").matvec
+        logger.warning("pyamg not available, use LU for the fracture block")
+
+    return spla.splu(A_ff.tocsc()).solve
+
+
+# ------------------------------------------------------------------------------#
+
+
+def block_preconditioner(A, assembler, param):
+    # block lower triangular preconditioner based on the fracture/interface
+    # splitting, the Schur complement of the interface is approximated by lumping the
+    # fracture block. It is not symmetric positive definite, so not suited for minres
+    fracture, interface = dof_partition(assembler)
+    fracture = np.hstack(fracture)
+
+    A = A.tocsr()
+    A_ff = A[fracture][:, fracture]
+    solve_ff = fracture_solver(A_ff, param)
+
+    if interface.size:
+        A_fi = A[fracture][:, interface]
+        A_if = A[interface][:, fracture]
+        A_ii = A[interface][:, interface]
+
+        diag = A_ff.diagonal().copy()
+        diag[diag == 0] = 1
+        S = A_ii - A_if * sps.diags(1.0 / diag) * A_fi
+        solve_ii = spla.splu(S.tocsc()).solve
+
+    def apply(r):
+        y = np.zeros(r.shape, dtype=A.dtype)
+        y[fracture] = solve_ff(r[fracture])
+        if interface.size:
+            r_i = r[interface] - A_if.dot(y[fracture])
+            y[interface] = solve_ii(r_i)
+        return y
+
+    return spla.LinearOperator(A.shape, matvec=apply, dtype=A.dtype)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def preconditioner(A, assembler, param):
+    precond = param.get("precond", "block")
+    if precond == "block":
+        return block_preconditioner(A, assembler, param)
+    elif precond == "schwarz":
+        return schwarz.Schwarz(A, assembler, param)
+    elif precond == "ilu":
+        ilu = spla.spilu(A.tocsc())
+        return spla.LinearOperator(A.shape, matvec=ilu.solve, dtype=A.dtype)
+    elif precond is None or precond == "none":
+        return None
+    else:
+        raise ValueError("Unknown preconditioner " + str(precond))
+
+
+# ------------------------------------------------------------------------------#
+
+
+def krylov(A, b, M, param, x0=None):
+    # preconditioned gmres, x0 is the initial guess
+    tol = param.get("solver_tol", 1e-10)
+    maxiter = param.get("solver_maxiter", 1000)
+
+    num_iter = [0]
+
+    def callback(_):
+        num_iter[0] += 1
+
+    restart = param.get("solver_restart", 50)
+    x, info = spla.gmres(
+        A,
+        b,
+        x0=x0,
+        M=M,
+        tol=tol,
+        restart=restart,
+        maxiter=maxiter,
+        callback=callback,
+    )
+
+    res = np.linalg.norm(b - A.dot(x)) / max(np.linalg.norm(b), np.finfo(float).tiny)
+    msg = "gmres with " + str(param.get("precond", "block")) + " preconditioner: "
+    msg += str(num_iter[0]) + " iterations, relative residual " + str(res)
+    if info == 0:
+        logger.info(msg)
+    elif info > 0:
+        logger.warning(msg + " (not converged)")
+    else:
+        raise ValueError("gmres failed with illegal input, info " + str(info))
+
+    return x
+
+
+# ------------------------------------------------------------------------------#
+
+
+def solve(A, b, assembler, param):
+    # solve the linear system with the method selected by param["solver"]: "direct"
+    # (default), "schur" which eliminates the fractures, "hybrid" which does the same
+    # with a symmetric definite solver for the traces, or "gmres"
+    method = param.get("solver", "direct")
+
+    if method == "direct":
+        return factorize(A, param, assembler).solve(b)
+    elif method in ["schur", "hybrid"]:
+        return schur.solve(A, b, assembler, param)
+
+    if method != "gmres":
+        raise ValueError("Unknown solver " + str(method))
+
+    M = preconditioner(A, assembler, param)
+    try:
+        return krylov(A, b, M, param)
+    finally:
+        if isinstance(M, schwarz.Schwarz):
+            M.close()
+
+
+# ------------------------------------------------------------------------------#
+
+
+class KrylovSolver(object):
+    # solver of a sequence of systems with the same matrix, e.g. the time steps of
+    # the transport: the preconditioner is built once and each solve starts from
+    # the previous solution
+
+    def __init__(self, A, assembler, param):
+        self.A = A.tocsr()
+        self.param = param
+        self.M = preconditioner(self.A, assembler, param)
+        self.x = None
+
+    def solve(self, b):
+        self.x = krylov(self.A, b, self.M, self.param, self.x)
+        return self.x
+
+    __call__ = solve
+
+    def close(self):
+        # release the threads of the preconditioner, if any
+        if isinstance(self.M, schwarz.Schwarz):
+            self.M.close()
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,72 @@
+import contextlib
+import json
+import time
+import numpy as np
+
+import profiler
+
+# ------------------------------------------------------------------------------#
+
+
+class Timer(object):
+    # collect the wall time of the phases of a run, a phase can be timed many times
+    # (e.g. once per time step), the phases named "<name>.<phase>" can be sampled
+    # by the profiler
+
+    def __init__(self, name=None):
+        self.name = name
+        self.phases = {}
+        self.order = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        label = name if self.name is None else self.name + "." + name
+        start = time.perf_counter()
+        try:
+            with profiler.phase(label):
+                yield
+        finally:
+            if name not in self.phases:
+                self.phases[name] = []
+                self.order.append(name)
+            self.phases[name].append(time.perf_counter() - start)
+
+    def summary(self):
+        summary = {}
+        for name in self.order:
+            t = np.array(self.phases[name])
+            summary[name] = {
+                "count": int(t.size),
+                "total": float(np.sum(t)),
+                "mean": float(np.mean(t)),
+                "min": float(np.amin(t)),
+                "max": float(np.amax(t)),
+                "p50": float(np.percentile(t, 50)),
+                "p90": float(np.percentile(t, 90)),
+                "p99": float(np.percentile(t, 99)),
+            }
+        return summary
+
+    def write(self, file_name, **info):
+        # write the manifest of the run, info collects other data (dof, nnz, etc.)
+        manifest = dict(info)
+        manifest["phases"] = self.summary()
+        with open(file_name, "w") as f:
+            json.dump(manifest, f, indent=2, default=to_json)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def to_json(value):
+    # conversion of the numpy types not handled by json
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, np.floating):
+        return float(value)
+    raise TypeError(repr(value) + " is not JSON serializable")
+
+
+# ------------------------------------------------------------------------------#
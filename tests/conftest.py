@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import scipy.sparse as sps
+import porepy as pp
+
+# ------------------------------------------------------------------------------#
+
+
+def small_gb(n=3, frac_id=(3, 7), two_sided=False):
+    # square fractures, the second in the xz plane and the others in the xy plane,
+    # which share the trace y = z = 0, with non-contiguous fracture ids. With
+    # two_sided the faces on y = 1 are also mapped to the trace, to have two faces
+    # of each fracture for each cell of the trace as for a crossing; only the
+    # connectivity is meaningful in this case and no mortar grids are created
+    g_t = pp.CartGrid(n, 1)
+    g_t.compute_geometry()
+
+    grids, face_cells = [], []
+    for k in np.arange(len(frac_id)):
+        g = pp.StructuredTriangleGrid([n, n], [1, 1])
+        g.compute_geometry()
+
+        # the faces on y = 0 are on the trace, mapped to the cell containing them
+        on_trace = np.abs(g.face_centers[1]) < 1e-10
+        if two_sided:
+            on_trace = np.logical_or(on_trace, np.abs(g.face_centers[1] - 1) < 1e-10)
+        faces = np.flatnonzero(on_trace)
+        cells = np.floor(g.face_centers[0, faces] * n).astype(int)
+        face_cells.append(
+            sps.csc_matrix(
+                (np.ones(faces.size, dtype=bool), (cells, faces)),
+                shape=(g_t.num_cells, g.num_faces),
+            )
+        )
+
+        if k == 1:
+            g.nodes = g.nodes[[0, 2, 1]]
+            g.compute_geometry()
+        g.frac_num = frac_id[k]
+        grids.append(g)
+
+    gb = pp.GridBucket()
+    gb.add_nodes(grids + [g_t])
+    for g, fc in zip(grids, face_cells):
+        gb.add_edge([g, g_t], fc)
+    gb.assign_node_ordering()
+    if not two_sided:
+        pp.meshing.create_mortar_grids(gb)
+
+    rng = np.random.RandomState(0)
+    for g, d in gb:
+        d["frac_num"] = g.frac_num * np.ones(g.num_cells) if g.dim == 2 else None
+        d[pp.PARAMETERS] = {"flow_data": {"bc": pp.BoundaryCondition(g)}}
+        d["P0_flux"] = rng.rand(3, g.num_cells)
+    return gb
+
+
+# ------------------------------------------------------------------------------#
+
+
+@pytest.fixture
+def gb():
+    return small_gb()
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+import compare
+
+# ------------------------------------------------------------------------------#
+
+
+def run(revision, cases):
+    return {"revision": revision, "date": "", "cases": cases}
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_compare_status():
+    # a change is significant only above the relative tolerance and the noise
+    base = run("a", {"c": {"fast": [1.0, 1.0, 1.0], "slow": [1.0, 1.0, 1.0]}})
+    new = {
+        "fast": [0.5, 0.5, 0.5],
+        "slow": [1.5, 1.5, 1.5],
+        "same": [1.0, 1.0, 1.0],
+    }
+    new = run("b", {"c": new, "other": {"fast": [1.0]}})
+    report = compare.compare(base, new, rel_tol=0.1, num_sigma=3, abs_tol=1e-3)
+
+    # the phases and cases missing in the baseline are skipped
+    status = {r[1]: r[5] for r in report}
+    assert status == {"fast": "faster", "slow": "SLOWER"}
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_compare_noise():
+    # a change within the noise of the timings is not significant
+    base = run("a", {"c": {"p": [1.0, 2.0, 3.0, 1.0, 2.0, 3.0]}})
+    new = run("b", {"c": {"p": [1.5, 2.5, 3.5, 1.5, 2.5, 3.5]}})
+    report = compare.compare(base, new, rel_tol=0.1, num_sigma=3, abs_tol=1e-3)
+    assert report[0][5] == "ok"
+
+    report = compare.compare(base, new, rel_tol=0.1, num_sigma=0, abs_tol=1e-3)
+    assert report[0][5] == "SLOWER"
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_get_baseline():
+    # the last run of a different revision or the run of the given revision
+    history = [run("aaa1", {}), run("bbb2", {}), run("ccc3", {})]
+    assert compare.get_baseline(history, run("ccc3", {}), None) is history[1]
+    assert compare.get_baseline(history, run("ccc3", {}), "aaa") is history[0]
+
+
+# ------------------------------------------------------------------------------#
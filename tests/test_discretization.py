@@ -0,0 +1,34 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import discretization
+
+from conftest import small_gb
+
+# ------------------------------------------------------------------------------#
+
+
+def test_fracture_stats():
+    # the statistics for each fracture, in the order of the sorted ids, are the ones
+    # computed fracture by fracture
+    gb = small_gb(frac_id=(7, 3, 5))
+    frac_index = discretization.fracture_index(gb)
+    assert np.array_equal(frac_index["frac_num"], [3, 5, 7])
+
+    rng = np.random.RandomState(0)
+    grids = [g for g, _ in gb if g.dim == 2]
+    c = rng.rand(sum([g.num_cells for g in grids]))
+    c_mean, c_min, c_max = discretization.fracture_stats(c, frac_index)
+
+    c_grid = np.split(c, np.cumsum([g.num_cells for g in grids])[:-1])
+    for g, c_g in zip(grids, c_grid):
+        k = np.flatnonzero(frac_index["frac_num"] == g.frac_num)[0]
+        volumes = g.cell_volumes
+        assert np.isclose(c_mean[k], np.sum(c_g * volumes) / np.sum(volumes))
+        assert c_min[k] == np.amin(c_g)
+        assert c_max[k] == np.amax(c_g)
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,44 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import export
+
+# ------------------------------------------------------------------------------#
+
+
+def test_export_steps_default():
+    # all the time steps by default, none if the export is disabled
+    param = {"n_steps": 5, "time_step": 0.1}
+    assert np.array_equal(export.export_steps(param), np.arange(5))
+
+    param["export"] = False
+    assert export.export_steps(param).size == 0
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_export_steps_every():
+    # every few steps, always including the last one
+    param = {"n_steps": 10, "time_step": 0.1, "export_every": 4}
+    assert np.array_equal(export.export_steps(param), [0, 4, 8, 9])
+
+    param["export_every"] = 3
+    assert np.array_equal(export.export_steps(param), [0, 3, 6, 9])
+
+    param["n_steps"] = 0
+    assert export.export_steps(param).size == 0
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_export_steps_times():
+    # the steps closest to the given times, without repetitions
+    param = {"n_steps": 10, "time_step": 0.5, "export_times": [0.9, 1.1, 4.4, 100]}
+    assert np.array_equal(export.export_steps(param), [2, 9])
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,161 @@
+import filecmp
+import io
+import os
+import sys
+import numpy as np
+import porepy as pp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import grid_export
+
+from conftest import small_gb
+
+# ------------------------------------------------------------------------------#
+
+
+def same_files(folder_0, folder_1):
+    files = sorted(os.listdir(folder_0))
+    assert files == sorted(os.listdir(folder_1))
+    _, mismatch, errors = filecmp.cmpfiles(folder_0, folder_1, files, shallow=False)
+    return not mismatch and not errors
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_parallel_export_matches_serial(gb, tmpdir):
+    # the fractures exported by a pool of processes are the same as in serial, with
+    # a window of one fracture to go through the wait on the pending exports
+    for binary in [False, True]:
+        folders = []
+        for num_workers in [1, 2]:
+            folder = str(tmpdir.join(str(binary) + "_" + str(num_workers))) + "/"
+            grid_export.grid_export(
+                gb, "P0_flux", folder, binary, num_workers, max_in_flight=1
+            )
+            folders.append(folder)
+        assert same_files(*folders)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def loop_maps(g):
+    # the connectivity maps computed cell by cell and face by face, as grid_export
+    # did before the vectorization
+    cell_faces_I, cell_faces_J = [], []
+    indices, indptr = g.cell_faces.indices, g.cell_faces.indptr
+    face_cells = -np.ones((g.num_faces, 2), dtype=int)
+    for cell in np.arange(g.num_cells):
+        faces = indices[indptr[cell] : indptr[cell + 1]]
+        cell_faces_I.append([cell] * faces.size)
+        cell_faces_J.append(faces.tolist())
+        for face in faces:
+            idx = np.where(face_cells[face, :] == -1)[0]
+            face_cells[face, idx[0]] = cell
+    cell_faces = np.vstack((np.hstack(cell_faces_I), np.hstack(cell_faces_J))).T
+
+    face_nodes_I, face_nodes_J = [], []
+    indices, indptr = g.face_nodes.indices, g.face_nodes.indptr
+    for face in np.arange(g.num_faces):
+        nodes = indices[indptr[face] : indptr[face + 1]]
+        face_nodes_I.append([face] * nodes.size)
+        face_nodes_J.append(nodes.tolist())
+    face_nodes = np.vstack((np.hstack(face_nodes_I), np.hstack(face_nodes_J))).T
+
+    cell_cells = np.zeros((g.num_cells, 3))
+    cell_connection = g.cell_connection_map()
+    indices, indptr = cell_connection.indices, cell_connection.indptr
+    for cell in np.arange(g.num_cells):
+        cells = np.sort(indices[indptr[cell] : indptr[cell + 1]])
+        cells = np.setdiff1d(cells, cell, assume_unique=True)
+        if cells.size < 3:
+            cells = np.append(cells, [-1] * (3 - cells.size))
+        cell_cells[cell, :] = cells.copy()
+
+    return {
+        "cell_faces": cell_faces,
+        "face_cells": face_cells,
+        "face_nodes": face_nodes,
+        "cell_cells": cell_cells,
+    }
+
+
+# ------------------------------------------------------------------------------#
+
+
+def savetxt(array):
+    out = io.BytesIO()
+    np.savetxt(out, array, fmt="%d", delimiter=",")
+    return out.getvalue()
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_connectivity_maps_match_loops():
+    # the vectorized maps are written as the ones computed with the loops
+    g = pp.StructuredTriangleGrid([3, 4], [1, 1])
+    g.compute_geometry()
+    expected = loop_maps(g)
+
+    cell_faces = grid_export.compressed_to_ij(g.cell_faces)
+    computed = {
+        "cell_faces": cell_faces,
+        "face_cells": grid_export.face_cells_map(cell_faces, g.num_faces),
+        "face_nodes": grid_export.compressed_to_ij(g.face_nodes),
+        "cell_cells": grid_export.cell_cells_map(g.cell_connection_map(), g.num_cells),
+    }
+    for name, array in expected.items():
+        assert savetxt(computed[name]) == savetxt(array), name
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_trace_arrays_two_fractures():
+    # the dense format of a trace of two fractures is the one of the previous
+    # export: for each cell the two faces of each fracture, sorted by fracture id
+    gb = small_gb(frac_id=(7, 3), two_sided=True)
+    g = list(gb.grids_of_dimension(1))[0]
+
+    faces = {}
+    for e, d_e in gb.edges_of_node(g):
+        g_h = gb.nodes_of_edge(e)[1]
+        face_cells = d_e["face_cells"].tocsr()
+        faces[g_h.frac_num] = face_cells.indices.reshape((g.num_cells, 2))
+    expected = np.hstack((faces[3], faces[7]))
+
+    frac_num, arrays = grid_export.trace_arrays(gb, g)
+    assert np.array_equal(frac_num, [3, 7])
+    assert np.array_equal(arrays["faces"][0], expected)
+    assert np.array_equal(arrays["indptr"][0], 4 * np.arange(g.num_cells + 1))
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_trace_arrays_three_fractures():
+    # a trace of three fractures has only the ragged format, each cell with the
+    # face of each fracture sorted by fracture id
+    gb = small_gb(frac_id=(7, 3, 5))
+    g = list(gb.grids_of_dimension(1))[0]
+
+    frac_num, arrays = grid_export.trace_arrays(gb, g)
+    assert np.array_equal(frac_num, [3, 5, 7])
+    assert "faces" not in arrays
+
+    indptr, frac = arrays["indptr"][0], arrays["frac"][0]
+    assert np.array_equal(indptr, 3 * np.arange(g.num_cells + 1))
+    assert np.array_equal(frac, np.tile([3, 5, 7], g.num_cells))
+
+    # each face is on the trace and in the cell of the trace containing it
+    grids = {g_h.frac_num: g_h for g_h in gb.grids_of_dimension(2)}
+    cells = np.repeat(np.arange(g.num_cells), np.diff(indptr))
+    for c, f, face in zip(cells, frac, arrays["face"][0]):
+        center = grids[f].face_centers[:, face]
+        assert np.allclose(center[1:], 0)
+        assert np.floor(center[0] * g.num_cells) == c
+
+
+# ------------------------------------------------------------------------------#
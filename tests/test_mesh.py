@@ -0,0 +1,51 @@
+import os
+import sys
+import scipy.sparse as sps
+import porepy as pp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import mesh
+
+# ------------------------------------------------------------------------------#
+
+
+def connectivity(gb):
+    # copy of the sparse matrices of the grids, edges and mortar grids
+    matrices = {}
+    for g, _ in gb:
+        matrices[(g, "cell_faces")] = g.cell_faces.copy()
+        matrices[(g, "face_nodes")] = g.face_nodes.copy()
+    for e, d in gb.edges():
+        matrices[(e, "face_cells")] = d["face_cells"].copy()
+        for key, value in vars(d["mortar_grid"]).items():
+            if sps.issparse(value):
+                matrices[(e, key)] = value.copy()
+    return matrices
+
+
+# ------------------------------------------------------------------------------#
+
+
+def same_matrix(A, B):
+    return A.shape == B.shape and (A != B).nnz == 0
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_coarsen_copy_keeps_original(gb):
+    # coarsening a copy, as done for MVEM, leaves the shared grid bucket unchanged
+    before = connectivity(gb)
+    grid_keys = ["cell_faces", "face_nodes", "face_cells"]
+    assert any(key[1] not in grid_keys for key in before), "no mortar projections"
+
+    gb_copy = mesh.copy_gb(gb)
+    pp.coarsening.coarsen(gb_copy, "by_volume")
+
+    after = connectivity(gb)
+    assert before.keys() == after.keys()
+    for key, value in before.items():
+        assert same_matrix(value, after[key]), key
+
+
+# ------------------------------------------------------------------------------#
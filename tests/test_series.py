@@ -0,0 +1,53 @@
+import os
+import sys
+import numpy as np
+import porepy as pp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import series
+
+# ------------------------------------------------------------------------------#
+
+
+def polygon_area(x, y):
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_cell_nodes_polygon_order():
+    # the nodes of each cell are the ones of the grid, and consecutive nodes are the
+    # two nodes of a face of the cell, so the polygon has the area of the cell
+    g_coarse = pp.StructuredTriangleGrid([4, 4], [1, 1])
+    g_coarse.compute_geometry()
+    pp.coarsening.coarsen(g_coarse, "by_volume")
+    g_coarse.compute_geometry()
+
+    grids = [pp.StructuredTriangleGrid([3, 2], [1, 1]), pp.CartGrid([3, 2], [1, 1])]
+    for g in grids:
+        g.compute_geometry()
+
+    for g in grids + [g_coarse]:
+        count, indices = series.cell_nodes(g)
+        assert np.array_equal(count, np.diff(g.cell_nodes().tocsc().indptr))
+
+        fn, cf = g.face_nodes.tocsc(), g.cell_faces.tocsc()
+        edges = [
+            frozenset(fn.indices[fn.indptr[f] : fn.indptr[f + 1]])
+            for f in np.arange(g.num_faces)
+        ]
+
+        start = np.cumsum(count) - count
+        for c in np.arange(g.num_cells):
+            nodes = indices[start[c] : start[c] + count[c]]
+            faces = cf.indices[cf.indptr[c] : cf.indptr[c + 1]]
+            cell_edges = set([edges[f] for f in faces])
+            polygon = set([frozenset(e) for e in zip(nodes, np.roll(nodes, -1))])
+            assert polygon == cell_edges
+
+            x, y = g.nodes[0, nodes], g.nodes[1, nodes]
+            assert np.isclose(polygon_area(x, y), g.cell_volumes[c])
+
+
+# ------------------------------------------------------------------------------#
@@ -0,0 +1,98 @@
+import os
+import sys
+import numpy as np
+import scipy.sparse as sps
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import schur
+import solver
+
+# ------------------------------------------------------------------------------#
+
+
+def random_system(size=50, seed=0):
+    # random non-symmetric and nonsingular sparse system
+    rng = np.random.RandomState(seed)
+    A = sps.random(size, size, density=0.1, random_state=rng)
+    A = (A + size * sps.eye(size)).tocsc()
+    return A, rng.rand(size)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def residual(A, x, b):
+    return np.linalg.norm(b - A.dot(x)) / np.linalg.norm(b)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_factorize_cold_and_warm_cache():
+    # the first factorization computes the column ordering, the second reuses it
+    A, b = random_system()
+    for param in [{}, {"permc_spec": "NATURAL"}, {"reorder": "rcm"}]:
+        solver.symbolic_cache.clear()
+        for _ in np.arange(2):
+            x = solver.factorize(A, param).solve(b)
+            assert residual(A, x, b) < 1e-12
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_factorize_new_values_same_pattern():
+    # a matrix with the same pattern and different values reuses the ordering
+    A, b = random_system()
+    solver.symbolic_cache.clear()
+    solver.factorize(A, {})
+
+    A_new = A.copy()
+    A_new.data *= 1 + np.arange(A_new.nnz) / A_new.nnz
+    x = solver.factorize(A_new, {}).solve(b)
+    assert residual(A_new, x, b) < 1e-12
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_factorize_multiple_rhs():
+    A, b = random_system()
+    B = np.column_stack((b, 2 * b))
+    solver.symbolic_cache.clear()
+    for _ in np.arange(2):
+        X = solver.factorize(A, {}).solve(B)
+        assert residual(A, X[:, 0], B[:, 0]) < 1e-12
+        assert residual(A, X[:, 1], B[:, 1]) < 1e-12
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_local_problem_column_blocks():
+    # the contribution to the Schur complement does not depend on the blocks
+    A, _ = random_system(size=60)
+    dof, interface = np.arange(40), np.arange(40, 60)
+    A_gt = A[dof][:, interface].toarray()
+    A_tg = A[interface][:, dof].toarray()
+    C = A_tg.dot(np.linalg.solve(A[dof][:, dof].toarray(), A_gt))
+
+    for block_size in [1, 3, 256]:
+        param = {"schur_block_size": block_size}
+        C_block = schur.local_problem(A.tocsr(), dof, interface, param)[3]
+        assert np.allclose(C_block.toarray(), C)
+
+
+# ------------------------------------------------------------------------------#
+
+
+def test_local_param():
+    # the local problems use rcm in place of the block reordering, the parameters
+    # of the caller are not modified
+    param = {"reorder": "block", "solver_tol": 1e-8}
+    assert solver.local_param(param) == {"reorder": "rcm", "solver_tol": 1e-8}
+    assert param["reorder"] == "block"
+    assert solver.local_param({"reorder": "rcm"}) == {"reorder": "rcm"}
+
+
+# ------------------------------------------------------------------------------#